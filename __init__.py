@@ -2,17 +2,25 @@
 
 from __future__ import annotations
 
-import datetime
 import logging
 
+import homeassistant.util.dt as hass_dt
+import voluptuous as vol
 from homeassistant.config_entries import SOURCE_IMPORT, ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import (HomeAssistant, ServiceCall, ServiceResponse,
+                                SupportsResponse)
+from homeassistant.exceptions import ConfigEntryError, HomeAssistantError
 from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN
+from .const import (CONF_REPLAY_PATH, CONF_REPLAY_SPEED, DEFAULT_REPLAY_SPEED,
+                    DEFAULT_TIMELINE_POINTS, DOMAIN, MAX_TIMELINE_POINTS,
+                    MIN_UPDATE_INTERVAL)
 from .coordinator import DesertBusUpdateCoordinator
+from .metrics import Metrics
+from .replay import ReplaySource
+from .storage import DesertBusStore
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -21,9 +29,46 @@ PLATFORMS: list[Platform] = [Platform.SENSOR]
 CONFIG_SCHEMA = cv.empty_config_schema(DOMAIN)
 
 
+TIMELINE_SCHEMA = vol.Schema(
+    {
+        vol.Optional("start"): cv.datetime,
+        vol.Optional("end"): cv.datetime,
+        vol.Optional("points", default=DEFAULT_TIMELINE_POINTS): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=MAX_TIMELINE_POINTS)
+        ),
+    }
+)
+
+
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Track the state of the sun."""
 
+    async def async_get_timeline(call: ServiceCall) -> ServiceResponse:
+        """Return a downsampled view of the recorded donation timeline."""
+        entries = [
+            entry_data
+            for entry_data in hass.data.get(DOMAIN, {}).values()
+            if "api" in entry_data
+        ]
+        if not entries:
+            raise HomeAssistantError("Desert Bus is not set up")
+        start = call.data.get("start")
+        end = call.data.get("end")
+        times, totals = await entries[0]["api"].async_timeline(
+            hass_dt.as_timestamp(start) if start else None,
+            hass_dt.as_timestamp(end) if end else None,
+            call.data["points"],
+        )
+        return {"timestamps": times, "totals": totals}
+
+    hass.services.async_register(
+        DOMAIN,
+        "get_timeline",
+        async_get_timeline,
+        schema=TIMELINE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
     hass.async_create_task(
         hass.config_entries.flow.async_init(
             DOMAIN,
@@ -37,24 +82,59 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Set up Desert Bus from a config entry."""
 
+    replay = None
+    if replay_path := config_entry.options.get(CONF_REPLAY_PATH):
+        try:
+            replay = await ReplaySource.async_load(
+                hass,
+                hass.config.path(replay_path),
+                config_entry.options.get(CONF_REPLAY_SPEED, DEFAULT_REPLAY_SPEED),
+            )
+        except ValueError as err:
+            raise ConfigEntryError(str(err)) from err
+
+    # A replay keeps its state in memory, the real run's snapshot is left alone
+    store = DesertBusStore(hass, None if replay else DOMAIN)
+    saved = await store.async_load()
     coordinator = DesertBusUpdateCoordinator(
         hass,
         _LOGGER,
+        config_entry=config_entry,
         name=DOMAIN,
-        update_interval=datetime.timedelta(seconds=15),
+        # The coordinator picks its own interval after each update
+        update_interval=MIN_UPDATE_INTERVAL,
+        # Listeners only hear about updates that changed something
+        always_update=False,
+        store=store,
+        metrics=Metrics(),
+        replay=replay,
     )
-    await coordinator.async_config_entry_first_refresh()
+    if replay is None and coordinator.async_restore(saved):
+        # Entities come up from the snapshot, revalidate without blocking setup
+        config_entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN} revalidate"
+        )
+    else:
+        await coordinator.async_config_entry_first_refresh()
     hass.data.setdefault(DOMAIN, {})[config_entry.entry_id] = {
-        "coordinator": coordinator
+        "coordinator": coordinator,
+        "store": store,
+        "replay": replay,
     }
     await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
+    config_entry.async_on_unload(config_entry.add_update_listener(async_reload_entry))
 
     return True
 
 
+async def async_reload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Reload the config entry when its options change."""
+    await hass.config_entries.async_reload(config_entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    hass.data[DOMAIN][config_entry.entry_id]["api"].close_api()
+    await hass.data[DOMAIN][config_entry.entry_id]["api"].async_close_api()
     if unload_ok := await hass.config_entries.async_unload_platforms(
         config_entry, PLATFORMS
     ):
@@ -0,0 +1,81 @@
+"""Per-endpoint circuit breaker for the vst.ninja and desertbus.org requests."""
+
+from __future__ import annotations
+
+import datetime
+import random
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of making a request while an endpoint's breaker is open."""
+
+    def __init__(self, endpoint: str, retry_at: datetime.datetime) -> None:
+        super().__init__(f"{endpoint} unavailable, next attempt at {retry_at}")
+        self.endpoint = endpoint
+        self.retry_at = retry_at
+
+
+class CircuitBreaker:
+    """Stop calling an endpoint after repeated failures.
+
+    After ``threshold`` failures in a row the breaker opens and requests are
+    refused until a jittered, exponentially growing delay has passed. Then a
+    single probe is let through (half-open), success closes the breaker and
+    failure opens it again for twice as long.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        endpoint: str,
+        threshold: int,
+        base_delay: datetime.timedelta,
+        max_delay: datetime.timedelta,
+    ) -> None:
+        self.endpoint = endpoint
+        self._threshold = threshold
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.retry_at: datetime.datetime | None = None
+
+    def check(self, now: datetime.datetime) -> None:
+        """Raise CircuitOpenError unless a request may be made now."""
+        if self.state == self.CLOSED:
+            return
+        if self.state == self.OPEN and self.retry_at is not None:
+            if now >= self.retry_at:
+                self.state = self.HALF_OPEN
+                return
+        # Open, or half-open with the probe still in flight
+        raise CircuitOpenError(self.endpoint, self.retry_at or now)
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.retry_at = None
+
+    def record_cancelled(self) -> None:
+        """Forget a request abandoned before it finished.
+
+        A cancelled probe would otherwise leave the breaker half-open for good,
+        it goes back to open so the next request probes again.
+        """
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+
+    def record_failure(self, now: datetime.datetime) -> None:
+        self.failures += 1
+        if self.state != self.HALF_OPEN and self.failures < self._threshold:
+            return
+        delay = min(self._base_delay * 2 ** min(self.trips, 16), self._max_delay)
+        # Jitter so every install doesn't come back to a recovering server at once
+        self.retry_at = now + delay * random.uniform(0.5, 1.0)
+        self.state = self.OPEN
+        self.trips += 1
@@ -7,11 +7,15 @@ from typing import Any
 
 import voluptuous as vol
 from homeassistant import config_entries
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
 
-from .const import DOMAIN
+from .const import (CONF_EXTRA_CHANNELS, CONF_MAX_STATE_AGE, CONF_MIN_DELTA,
+                    CONF_REPLAY_PATH, CONF_REPLAY_SPEED, CONF_STATISTICS_MODE,
+                    CONF_UPDATE_INTERVAL, DEFAULT_MAX_STATE_AGE,
+                    DEFAULT_MIN_DELTA, DEFAULT_REPLAY_SPEED,
+                    DEFAULT_UPDATE_INTERVAL, DOMAIN)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -34,6 +38,14 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> OptionsFlow:
+        """Create the options flow."""
+        return OptionsFlow()
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> config_entries.ConfigFlowResult:
@@ -96,3 +108,55 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     ) -> config_entries.ConfigFlowResult:
         """Handle import from configuration.yaml."""
         return await self.async_step_user(user_input)
+
+
+class OptionsFlow(config_entries.OptionsFlow):
+    """Handle Desert Bus options."""
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> config_entries.ConfigFlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(data=user_input)
+
+        options = self.config_entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_UPDATE_INTERVAL,
+                        default=options.get(
+                            CONF_UPDATE_INTERVAL, DEFAULT_UPDATE_INTERVAL
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=300)),
+                    vol.Optional(
+                        CONF_EXTRA_CHANNELS,
+                        description={
+                            "suggested_value": options.get(CONF_EXTRA_CHANNELS)
+                        },
+                    ): str,
+                    vol.Required(
+                        CONF_MIN_DELTA,
+                        default=options.get(CONF_MIN_DELTA, DEFAULT_MIN_DELTA),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_MAX_STATE_AGE,
+                        default=options.get(CONF_MAX_STATE_AGE, DEFAULT_MAX_STATE_AGE),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=1, max=86400)),
+                    vol.Required(
+                        CONF_STATISTICS_MODE,
+                        default=options.get(CONF_STATISTICS_MODE, False),
+                    ): bool,
+                    vol.Optional(
+                        CONF_REPLAY_PATH,
+                        description={"suggested_value": options.get(CONF_REPLAY_PATH)},
+                    ): str,
+                    vol.Required(
+                        CONF_REPLAY_SPEED,
+                        default=options.get(CONF_REPLAY_SPEED, DEFAULT_REPLAY_SPEED),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=1, max=3600)),
+                }
+            ),
+        )
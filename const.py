@@ -4,6 +4,8 @@ import datetime
 
 DOMAIN = "desertbus"
 SIGNAL_EVENTS_CHANGED = f"{DOMAIN}_events_changed"
+# Fired on the bus with the hour number and time each time an hour is bought
+EVENT_HOUR_PURCHASED = f"{DOMAIN}_hour_purchased"
 
 CHECK_URL_BASE = "https://vst.ninja"
 SCRAPE_URL_BASE = "https://desertbus.org"
@@ -14,15 +16,97 @@ STATS_URL_TEMPLATE = f"{CHECK_URL_BASE}/DB{{year}}/data/DB{{year}}_stats.json"
 SCRAPE_URL_TEMPLATE = f"{SCRAPE_URL_BASE}/{{year}}/"
 
 DB_YEAR_OFFSET = 2006
+# Past runs' stats fetched at once when filling the year-over-year cache
+PAST_YEARS_CONCURRENCY = 4
+# Past runs without stats are checked for them again after this long
+PAST_YEARS_MISSING_TTL = datetime.timedelta(weeks=1)
+
+# Seconds before an HTTP request to vst.ninja or desertbus.org is abandoned
+REQUEST_TIMEOUT = 10
+
+# Failures in a row before an endpoint is left alone, and how long for
+BREAKER_THRESHOLD = 3
+BREAKER_BASE_DELAY = datetime.timedelta(seconds=30)
+BREAKER_MAX_DELAY = datetime.timedelta(minutes=30)
 
 RATE_LIMITS: dict = {
-    "STATS": {
-        "DURING_RUN": datetime.timedelta(minutes=15),
-        "POST_RUN": datetime.timedelta(hours=6),
-    },
     "OMEGA_SHIFT": datetime.timedelta(minutes=10),
 }
 
+
+class PHASES:
+    OFF_SEASON = "off_season"
+    PRE_ANNOUNCEMENT = "pre_announcement"
+    PRE_RUN = "pre_run"
+    RUNNING = "running"
+    POST_RUN = "post_run"
+
+
+# How long DB stats are reused in each phase before they are fetched again
+PHASE_STATS_INTERVALS: dict[str, datetime.timedelta] = {
+    PHASES.OFF_SEASON: datetime.timedelta(weeks=1),
+    PHASES.PRE_ANNOUNCEMENT: datetime.timedelta(days=1),
+    PHASES.PRE_RUN: datetime.timedelta(minutes=15),
+    PHASES.RUNNING: datetime.timedelta(minutes=15),
+    PHASES.POST_RUN: datetime.timedelta(hours=6),
+}
+
+# The coordinator never wakes up more often than this
+MIN_UPDATE_INTERVAL = datetime.timedelta(seconds=15)
+
+# Options
+CONF_UPDATE_INTERVAL = "update_interval"
+# Minimum seconds between state writes of the live PubNub sensors
+DEFAULT_UPDATE_INTERVAL = 1.0
+# Comma separated channels on the same subscribe key to track alongside the
+# main total, over the same subscription
+CONF_EXTRA_CHANNELS = "extra_channels"
+# Smallest change of a dollar valued live sensor worth a state write, and
+# seconds after which an unchanged state is written anyway
+CONF_MIN_DELTA = "min_delta"
+DEFAULT_MIN_DELTA = 0.0
+CONF_MAX_STATE_AGE = "max_state_age"
+DEFAULT_MAX_STATE_AGE = 600.0
+# Recorded timeline to play back instead of the live feed, for load testing
+CONF_REPLAY_PATH = "replay_path"
+CONF_REPLAY_SPEED = "replay_speed"
+DEFAULT_REPLAY_SPEED = 60.0
+# Record hourly statistics of the total instead of a state per message
+CONF_STATISTICS_MODE = "statistics_mode"
+STATISTICS_FLUSH_INTERVAL = datetime.timedelta(minutes=5)
+# Written hours are kept this long so late samples, e.g. from filling a
+# PubNub gap, are merged into them. Anything later is dropped.
+STATISTICS_LATE_WINDOW = datetime.timedelta(hours=6)
+# How often the total raised sensor writes its state in statistics mode
+STATISTICS_STATE_INTERVAL = datetime.timedelta(minutes=5)
+
+# Donation samples kept in memory for rate sensors, 16 bytes each
+TIMELINE_CAPACITY = 32768
+# Rate sensors are re-evaluated this many times per window even without new
+# messages, so they fall back to zero once donations stop
+RATE_REFRESHES_PER_WINDOW = 6
+# Time constant of the smoothed donation rate behind the projections
+PROJECTION_TIME_CONSTANT = datetime.timedelta(minutes=30)
+# The projections are worked out again this often without new messages, the
+# smoothed rate decays meanwhile
+PROJECTION_REFRESH = PROJECTION_TIME_CONSTANT / RATE_REFRESHES_PER_WINDOW
+
+# On-disk donation timeline, under the Home Assistant .storage directory
+HISTORY_FILE = f"{DOMAIN}_timeline"
+# Messages per PubNub history request, the API maximum for one channel
+HISTORY_BATCH_SIZE = 100
+HISTORY_FLUSH_INTERVAL = datetime.timedelta(minutes=1)
+# Backoff between attempts at a history page the backfill failed to fetch
+HISTORY_RETRY_BASE_DELAY = datetime.timedelta(seconds=30)
+HISTORY_RETRY_MAX_DELAY = datetime.timedelta(minutes=30)
+# Live samples waiting for the timeline file, halved whenever it fills up
+# while the backfill is still running
+HISTORY_PENDING_LIMIT = 32768
+# Wait before subscribing again once PubNub has given up reconnecting
+PUBNUB_RESUBSCRIBE_DELAY = datetime.timedelta(minutes=1)
+DEFAULT_TIMELINE_POINTS = 200
+MAX_TIMELINE_POINTS = 2000
+
 BUS_TIMEZONE = datetime.timezone(datetime.timedelta(hours=-8))
 
 
@@ -1,43 +1,226 @@
+import asyncio
+import bisect
+import dataclasses
 import datetime
 import json
 import logging
 import typing
-import urllib.error
-import urllib.request
 
-import dateutil
+import aiohttp
 import homeassistant.util.dt as hass_dt
-import lxml.html
 from homeassistant.core import (CALLBACK_TYPE, Event, HassJob, HassJobType,
                                 HomeAssistant, callback)
 from homeassistant.helpers import entity, event
-from homeassistant.helpers.typing import StateType
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.update_coordinator import (DataUpdateCoordinator,
+                                                      UpdateFailed)
 
-from .const import (BUS_TIMEZONE, DB_YEAR_OFFSET, OMEGA_CHECK_URL, RATE_LIMITS,
+from .breaker import CircuitBreaker, CircuitOpenError
+from .const import (BREAKER_BASE_DELAY, BREAKER_MAX_DELAY, BREAKER_THRESHOLD,
+                    BUS_TIMEZONE, DB_YEAR_OFFSET, DOMAIN, OMEGA_CHECK_URL,
+                    PAST_YEARS_CONCURRENCY, PAST_YEARS_MISSING_TTL,
+                    PHASE_STATS_INTERVALS, RATE_LIMITS, REQUEST_TIMEOUT,
                     SCRAPE_URL_TEMPLATE, SHIFTS, STATS_URL_TEMPLATE)
+from .http_cache import ConditionalCache
+from .metrics import Metrics
+from .replay import ReplaySource, WallClock
+from .schedule import get_phase, is_bussing, next_wakeup
+from .storage import DesertBusStore
 from .util import BusMath
 
 _LOGGER = logging.getLogger(__name__)
 
 
-class DesertBusUpdateCoordinator(DataUpdateCoordinator):
+def _parse_db_page(page: bytes) -> dict:
+    # lxml and dateutil are only needed the few days a year the page is
+    # scraped, so they are imported here, in the executor, on first use
+    from .scrape import parse_db_page
+
+    return parse_db_page(page)
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class DesertBusData:
+    """Everything the coordinator sensors show.
+
+    Compared field by field after each update, listeners are only told when
+    something actually changed.
+    """
+
+    current_shift: str
+    now_bussing: bool
+    total_raised: float
+    start_time: datetime.datetime
+    db_year: int
+    run_purchased: int
+    next_hour_price_total: float
+    next_hour_price_remaining: float
+    # Set while the last good values are served after a failed fetch
+    stats_stale: bool = False
+    shift_stale: bool = False
+
+
+class DesertBusUpdateCoordinator(DataUpdateCoordinator[DesertBusData]):
     """Desert Bus Data Coordinator"""
 
-    _shifts = {
-        (datetime.time(0), datetime.time(6)): SHIFTS.ZETA,
-        (datetime.time(6), datetime.time(12)): SHIFTS.DAWN,
-        (datetime.time(12), datetime.time(18)): SHIFTS.ALPHA,
-        (datetime.time(18), datetime.time(23, 59, 59)): SHIFTS.NIGHT,
-    }
+    # Start of each shift in bus time, sorted
+    _shift_starts = (
+        datetime.time(0),
+        datetime.time(6),
+        datetime.time(12),
+        datetime.time(18),
+    )
+    _shift_names = (SHIFTS.ZETA, SHIFTS.DAWN, SHIFTS.ALPHA, SHIFTS.NIGHT)
 
-    def __init__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+    def __init__(
+        self,
+        *args: typing.Any,
+        store: DesertBusStore,
+        metrics: Metrics,
+        replay: ReplaySource | None = None,
+        **kwargs: typing.Any,
+    ) -> None:
         super().__init__(*args, **kwargs)
+        self._store = store
+        self._metrics = metrics
+        # Replays serve stats from the recording and run on its clock
+        self._replay = replay
+        self._clock = WallClock() if replay is None else replay.clock
         self._last_omega_check = datetime.datetime.min.replace(tzinfo=BUS_TIMEZONE)
         self._last_stats_check = datetime.datetime.min.replace(tzinfo=BUS_TIMEZONE)
+        # Failed and empty checks count too, so they wait out the phase's
+        # interval rather than retrying on every wake-up
+        self._last_stats_attempt = self._last_stats_check
+        self._http = ConditionalCache(
+            async_get_clientsession(self.hass),
+            aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+            metrics,
+        )
+        self._breakers = {
+            endpoint: CircuitBreaker(
+                endpoint, BREAKER_THRESHOLD, BREAKER_BASE_DELAY, BREAKER_MAX_DELAY
+            )
+            for endpoint in ("stats", "scrape", "omega")
+        }
+        # Set while the last good values are being served after a failure
+        self._stats_stale = False
+        self._shift_stale = False
+        # Summary of every finished run by year, None where there are no stats.
+        # A run's stats don't change once it is over, so these are never
+        # fetched again. Missing stats may be published later, those are
+        # checked for again PAST_YEARS_MISSING_TTL after the last 404.
+        self._past_years: dict[str, dict[str, typing.Any] | None] = dict(
+            store.data.get("past_years", {})
+        )
+        self._past_years_missing: dict[str, float] = dict(
+            store.data.get("past_years_missing", {})
+        )
+        self._loading_years = False
+        self._omega = False
+        self._clock_shift: str = SHIFTS.ZETA
+        self._unsub_shift: CALLBACK_TYPE | None = None
+        self._async_schedule_shift_change()
+
+    @callback
+    def async_restore(self, saved: dict[str, typing.Any]) -> bool:
+        """Seed data from the last saved snapshot, returns False if there was none."""
+        if not (stats := saved.get("coordinator")):
+            return False
+        try:
+            last_stats_check = datetime.datetime.fromisoformat(
+                saved["last_stats_check"]
+            )
+            last_omega_check = datetime.datetime.fromisoformat(
+                saved["last_omega_check"]
+            )
+            start_time = datetime.datetime.fromisoformat(stats["start_time"])
+            data = DesertBusData(
+                current_shift=self.current_shift,
+                now_bussing=is_bussing(
+                    self._clock.now(), start_time, stats["run_purchased"]
+                ),
+                total_raised=stats["total_raised"],
+                start_time=start_time,
+                db_year=int(stats["db_year"]),
+                run_purchased=stats["run_purchased"],
+                next_hour_price_total=stats["next_hour_price_total"],
+                next_hour_price_remaining=stats["next_hour_price_remaining"],
+                stats_stale=stats.get("stats_stale", False),
+                shift_stale=stats.get("shift_stale", False),
+            )
+        except (AttributeError, KeyError, TypeError, ValueError) as err:
+            # Hand edited or written by another version, fetch afresh instead
+            _LOGGER.warning("Ignoring unreadable saved stats: %r", err)
+            return False
+        self._last_stats_check = last_stats_check
+        self._last_stats_attempt = last_stats_check
+        self._last_omega_check = last_omega_check
+        self.async_set_updated_data(data)
+        _LOGGER.debug("Restored stats last checked %s", self._last_stats_check)
+        return True
+
+    @callback
+    def _async_save(self, data: DesertBusData) -> None:
+        self._store.async_update(
+            coordinator={
+                **dataclasses.asdict(data),
+                "start_time": data.start_time.isoformat(),
+            },
+            last_stats_check=self._last_stats_check.isoformat(),
+            last_omega_check=self._last_omega_check.isoformat(),
+        )
+
+    def _shift_at(self, bus_now: datetime.datetime) -> tuple[str, datetime.datetime]:
+        """Return the shift at bus_now and the time the following one starts."""
+        index = bisect.bisect_right(self._shift_starts, bus_now.time()) - 1
+        next_index = index + 1
+        next_day = bus_now.date()
+        if next_index == len(self._shift_starts):
+            next_index = 0
+            next_day += datetime.timedelta(days=1)
+        next_start = datetime.datetime.combine(
+            next_day, self._shift_starts[next_index], tzinfo=BUS_TIMEZONE
+        )
+        return self._shift_names[index], next_start
+
+    @callback
+    def _async_schedule_shift_change(self) -> None:
+        self._clock_shift, next_start = self._shift_at(
+            self._clock.now().astimezone(BUS_TIMEZONE)
+        )
+        _LOGGER.debug("Shift is %s until %s", self._clock_shift, next_start)
+        self._unsub_shift = event.async_track_point_in_time(
+            self.hass, self._async_shift_changed, self._clock.to_real(next_start)
+        )
+
+    @callback
+    def _async_shift_changed(self, _now: datetime.datetime) -> None:
+        self._async_schedule_shift_change()
+        if self.data is not None:
+            # Not async_set_updated_data, that would push back the next refresh
+            self.data = dataclasses.replace(self.data, current_shift=self.current_shift)
+            self.async_update_listeners()
+
+    @property
+    def phase(self) -> str:
+        if self.data is None:
+            return get_phase(self._clock.now(), None, 0)
+        return get_phase(
+            self._clock.now(), self.data.start_time, self.data.run_purchased
+        )
+
+    @property
+    def current_shift(self) -> str:
+        return SHIFTS.OMEGA if self._omega else self._clock_shift
+
+    async def async_shutdown(self) -> None:
+        if self._unsub_shift is not None:
+            self._unsub_shift()
+            self._unsub_shift = None
+        await super().async_shutdown()
 
     def get_db_year(self) -> int:
-        today = datetime.date.today()
+        today = self._clock.now().date()
         if today.month < 11:
             # If it's before November, we're likely talking about LAST year's
             # DB run.
@@ -45,90 +228,180 @@ class DesertBusUpdateCoordinator(DataUpdateCoordinator):
         # If it's November or later, it's likely THIS year's run
         return today.year - DB_YEAR_OFFSET
 
-    def _fetch_stats(self, year: int) -> dict:
+    @property
+    def clock(self) -> WallClock:
+        return self._clock
+
+    @property
+    def http_stats(self) -> dict[str, int]:
+        return self._http.stats
+
+    @property
+    def breakers(self) -> dict[str, CircuitBreaker]:
+        return self._breakers
+
+    async def _async_get(
+        self,
+        endpoint: str,
+        url: str,
+        parse: typing.Callable[[bytes], typing.Awaitable[typing.Any]],
+    ) -> typing.Any:
+        """Fetch url through the endpoint's circuit breaker."""
+        breaker = self._breakers[endpoint]
+        breaker.check(hass_dt.now())
+        try:
+            result = await self._http.async_get(url, parse)
+        except aiohttp.ClientResponseError as err:
+            if err.status >= 500 or err.status == 429:
+                breaker.record_failure(hass_dt.now())
+            else:
+                # The server is up, it just doesn't have what we asked for
+                breaker.record_success()
+            raise
+        except asyncio.CancelledError:
+            # Unload or shutdown, says nothing about the endpoint
+            breaker.record_cancelled()
+            raise
+        except Exception:
+            breaker.record_failure(hass_dt.now())
+            raise
+        breaker.record_success()
+        return result
+
+    async def _fetch_stats(self, year: int) -> dict:
+        if self._replay is not None:
+            return self._replay.stats(year)
         stats_url = STATS_URL_TEMPLATE.format(year=year)
         _LOGGER.debug("Fetching stats from %s", stats_url)
-        with urllib.request.urlopen(stats_url) as stats:
-            db_stats = json.load(stats)[0]
-            assert isinstance(db_stats, dict)
-            return db_stats
+        return await self._async_get("stats", stats_url, self._parse_stats)
 
-    def _scrape_stats(self, year: int) -> dict:
+    @staticmethod
+    async def _parse_stats(body: bytes) -> dict:
+        db_stats = json.loads(body)[0]
+        assert isinstance(db_stats, dict)
+        return db_stats
+
+    async def _scrape_stats(self, year: int) -> dict:
         scrape_url = SCRAPE_URL_TEMPLATE.format(year=year)
         _LOGGER.debug("Fetching scrape from %s", scrape_url)
-        with urllib.request.urlopen(scrape_url) as scrape:
-            db_parser = lxml.html.parse(scrape)
-            db_root = db_parser.getroot()
-            possible_elements = db_root.cssselect("div .text-xs.text-brand-gold")
-            for element in possible_elements:
-                element_text = element.text
-                search_str = "Begins "
-                loc = element_text.find(search_str)
-                if loc != -1:
-                    start_text = element_text[loc + len(search_str) :]
-                    start_time = dateutil.parser.parse(start_text, ignoretz=True)
-                search_str = " Total Raised"
-                loc = element_text.find(search_str)
-                if loc != -1:
-                    raised_text = element.getnext().text
-                    total_raised = raised_text[raised_text.find("$") + 1 :]
+        return await self._async_get("scrape", scrape_url, self._async_parse_scrape)
+
+    async def _async_parse_scrape(self, page: bytes) -> dict:
+        # Parsing is CPU bound, keep it off the event loop
+        return await self.hass.async_add_executor_job(_parse_db_page, page)
+
+    async def _async_check_omega(self) -> bool:
+        if self._replay is not None:
+            return False
+        _LOGGER.debug("Fetching omega check from %s", OMEGA_CHECK_URL)
+        return await self._async_get("omega", OMEGA_CHECK_URL, self._parse_omega)
+
+    @staticmethod
+    async def _parse_omega(body: bytes) -> bool:
+        return int(body.strip()) == 1
+
+    def _repeat_stats(self) -> dict:
+        if self.data is None:
+            raise UpdateFailed("No DB stats available yet")
+        return {
+            "now_bussing": is_bussing(
+                self._clock.now(), self.data.start_time, self.data.run_purchased
+            ),
+            "db_year": self.data.db_year,
+            "start_time": self.data.start_time,
+            "total_raised": self.data.total_raised,
+            "run_purchased": self.data.run_purchased,
+            "next_hour_price_total": self.data.next_hour_price_total,
+            "next_hour_price_remaining": self.data.next_hour_price_remaining,
+        }
+
+    def _missing_years(self, db_year: int) -> list[int]:
+        recheck_before = (self._clock.now() - PAST_YEARS_MISSING_TTL).timestamp()
+        return [
+            year
+            for year in range(1, db_year)
+            if str(year) not in self._past_years
+            or (
+                self._past_years[str(year)] is None
+                # Cached as missing before the 404s were timestamped
+                and self._past_years_missing.get(str(year), 0.0) < recheck_before
+            )
+        ]
+
+    async def _async_load_past_years(self, db_year: int) -> None:
+        """Fetch the summary of every run before db_year that isn't cached."""
+        semaphore = asyncio.Semaphore(PAST_YEARS_CONCURRENCY)
 
+        async def load_year(year: int) -> dict[str, typing.Any] | None:
+            async with semaphore:
+                try:
+                    db_stats = await self._fetch_stats(year)
+                except aiohttp.ClientResponseError as err:
+                    if err.status != 404:
+                        raise
+                    return None
             return {
-                "start-time": start_time.isoformat(),
-                "total-raised": total_raised.replace(",", ""),
+                "start_time": db_stats["Year Start Date-Time"],
+                "total_raised": float(db_stats["Total Raised"]),
+                "run_purchased": int(db_stats["Max Hour Purchased"]),
             }
 
-    def _repeat_stats(self) -> dict:
+        years = self._missing_years(db_year)
+        try:
+            results = await asyncio.gather(
+                *(load_year(year) for year in years), return_exceptions=True
+            )
+        finally:
+            self._loading_years = False
+        loaded = 0
+        for year, result in zip(years, results):
+            if isinstance(result, Exception):
+                # Left out of the cache, so it is tried again next update
+                _LOGGER.debug("Unable to load DB%d stats: %s", year, result)
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            self._past_years[str(year)] = result
+            if result is None:
+                self._past_years_missing[str(year)] = self._clock.now().timestamp()
+            else:
+                self._past_years_missing.pop(str(year), None)
+            loaded += 1
+        self._store.async_update(
+            past_years=self._past_years, past_years_missing=self._past_years_missing
+        )
+        _LOGGER.debug("Loaded stats for %d of %d past runs", loaded, len(years))
+        self.async_update_listeners()
+
+    @property
+    def past_runs(self) -> dict[int, dict[str, typing.Any]]:
+        """Summaries of the runs before the current one, by year number."""
+        if self.data is None:
+            return {}
+        db_year = self.data.db_year
         return {
-            "now_bussing": self.data["now_bussing"],
-            "db_year": self.data["db_year"],
-            "start_time": self.data["start_time"],
-            "total_raised": self.data["total_raised"],
-            "run_purchased": self.data["run_purchased"],
-            "next_hour_price_total": self.data["next_hour_price_total"],
-            "next_hour_price_remaining": self.data["next_hour_price_remaining"],
+            int(year): summary
+            for year, summary in self._past_years.items()
+            if summary is not None and int(year) < db_year
         }
 
-    def get_stats(self) -> dict:
+    async def get_stats(self) -> dict:
         """"""
         _LOGGER.debug(self.data)
-        now = hass_dt.now()
+        now = self._clock.now()
         if self.data is not None:
             _LOGGER.debug("Last updated %s", self._last_stats_check)
-            if (
-                now.month != 11
-                and now.isocalendar().week == self._last_stats_check.isocalendar().week
-            ):
-                # Check stats once a week outside of November
-                _LOGGER.debug("Checking once a week")
-                return self._repeat_stats()
-            elif (
-                self.data["start_time"].year < now.year
-                and self._last_stats_check.day < now.day
-            ):
-                # In november check once a day untill this years stats show up
-                _LOGGER.debug("Checking once a day")
-                return self._repeat_stats()
-            elif (
-                self.data["start_time"]
-                + datetime.timedelta(hours=self.data["run_purchased"])
-            ) < now and (
-                self._last_stats_check + RATE_LIMITS["STATS"]["POST_RUN"] < now
-            ):
-                # Then every six hours after the run
-                _LOGGER.debug("Checking every %s", RATE_LIMITS["STATS"]["POST_RUN"])
-                return self._repeat_stats()
-
-            elif self._last_stats_check + RATE_LIMITS["STATS"]["DURING_RUN"] > now:
-                # and every 15 minutes durring the run
-                _LOGGER.debug("Checking every %s", RATE_LIMITS["STATS"]["DURING_RUN"])
+            interval = PHASE_STATS_INTERVALS[self.phase]
+            if now < self._last_stats_attempt + interval:
+                _LOGGER.debug("%s, checking every %s", self.phase, interval)
                 return self._repeat_stats()
+        self._last_stats_attempt = now
 
         db_stats = {}
         try:
-            db_stats = self._fetch_stats(self.get_db_year())
-        except urllib.error.HTTPError as err:
-            if err.code == 404:
+            db_stats = await self._fetch_stats(self.get_db_year())
+        except aiohttp.ClientResponseError as err:
+            if err.status == 404:
                 _LOGGER.debug(
                     "Got 404 for DB Stats JSON, new year's probably isn't up yet, try pulling last years"
                 )
@@ -136,9 +409,25 @@ class DesertBusUpdateCoordinator(DataUpdateCoordinator):
                     now.month == 11 and now.day >= 7
                 ):  # We're in November by more than a week, lets try scraping the start time
                     try:
-                        scraped_stats = self._scrape_stats(now.year)
-                    except urllib.error.HTTPError as err:
+                        scraped_stats = await self._scrape_stats(now.year)
+                    except aiohttp.ClientResponseError as err:
+                        if err.status != 404:
+                            _LOGGER.error("Error scraping DB page for stats %s", err)
+                            self._stats_stale = True
+                            return self._repeat_stats()
+                        # Not a failure, there's just nothing newer to serve.
+                        # Checked again once the phase's interval is up.
+                        _LOGGER.debug("No DB page for %d yet", now.year)
+                        self._stats_stale = False
+                        return self._repeat_stats()
+                    except (
+                        aiohttp.ClientError,
+                        TimeoutError,
+                        ValueError,
+                        CircuitOpenError,
+                    ) as err:
                         _LOGGER.error("Error scraping DB page for stats %s", err)
+                        self._stats_stale = True
                         return self._repeat_stats()
                     db_stats = {
                         "Year Start Date-Time": scraped_stats["start-time"],
@@ -148,13 +437,22 @@ class DesertBusUpdateCoordinator(DataUpdateCoordinator):
                     }
 
                 else:
-                    db_stats = self._fetch_stats(self.get_db_year() - 1)
+                    db_stats = await self._fetch_stats(self.get_db_year() - 1)
+            else:
+                raise
+        except CircuitOpenError as err:
+            _LOGGER.debug("Serving last DB stats: %s", err)
+            self._stats_stale = True
+            return self._repeat_stats()
         except json.JSONDecodeError as err:
-            _LOGGER.critical(err)
+            _LOGGER.error("Invalid DB stats JSON: %s", err)
 
         if db_stats:
             self._last_stats_check = now
+            self._stats_stale = False
+            _LOGGER.debug("HTTP cache stats %s", self._http.stats)
         else:
+            self._stats_stale = True
             return self._repeat_stats()
 
         bus_start = datetime.datetime.fromisoformat(db_stats["Year Start Date-Time"])
@@ -168,9 +466,7 @@ class DesertBusUpdateCoordinator(DataUpdateCoordinator):
         next_hour_price_remaining = next_hour_price_total - (total - cost_of_purchased)
         return {
             "start_time": bus_start,
-            "now_bussing": (
-                (bus_start + datetime.timedelta(hours=run_purchased)) > now >= bus_start
-            ),
+            "now_bussing": is_bussing(now, bus_start, run_purchased),
             "total_raised": total,
             "db_year": db_stats["Year Number"],
             "run_purchased": run_purchased,
@@ -178,38 +474,95 @@ class DesertBusUpdateCoordinator(DataUpdateCoordinator):
             "next_hour_price_remaining": next_hour_price_remaining,
         }
 
-    def get_shift(self) -> str | None:
-        now = hass_dt.now()
+    async def get_shift(self) -> str | None:
+        """Return the current shift, checking for omega shift while bussing.
+
+        Regular shift changes are scheduled at their boundaries, only the
+        omega shift check needs polling.
+        """
+        now = self._clock.now()
+        if self.data is None or not self.data.now_bussing:
+            self._omega = False
+            self._shift_stale = False
+        elif now - self._last_omega_check >= RATE_LIMITS["OMEGA_SHIFT"]:
+            _LOGGER.debug("NEED TO UPDATE OMEGA SHIFT")
+            self._omega = await self._async_check_omega()
+            self._last_omega_check = now
+            self._shift_stale = False
+        return self.current_shift
+
+    @property
+    def metrics(self) -> Metrics:
+        return self._metrics
+
+    async def _async_update_data(self) -> DesertBusData:
+        with self._metrics.timer("coordinator_tick"):
+            return await self._async_tick()
+
+    async def _async_tick(self) -> DesertBusData:
+        # Stats and the omega check hit different endpoints, run them together
+        stats_result, shift_result = await asyncio.gather(
+            self.get_stats(), self.get_shift(), return_exceptions=True
+        )
+        if isinstance(stats_result, BaseException):
+            if not isinstance(
+                stats_result, (aiohttp.ClientError, TimeoutError, CircuitOpenError)
+            ):
+                raise stats_result
+            if self.data is None:
+                raise UpdateFailed(f"Error fetching DB stats: {stats_result}")
+            _LOGGER.error("Error fetching DB stats: %s", stats_result)
+            self._stats_stale = True
+            db_stats = self._repeat_stats()
+        else:
+            db_stats = stats_result
+        if isinstance(shift_result, BaseException):
+            if isinstance(shift_result, CircuitOpenError):
+                _LOGGER.debug("Keeping last shift: %s", shift_result)
+            elif isinstance(
+                shift_result, (aiohttp.ClientError, TimeoutError, ValueError)
+            ):
+                _LOGGER.error("Error checking for omega shift: %s", shift_result)
+            else:
+                raise shift_result
+            self._shift_stale = True
+            current_shift = self.current_shift
+        else:
+            current_shift = shift_result
+        now = self._clock.now()
+        phase = get_phase(now, db_stats["start_time"], db_stats["run_purchased"])
+        wakeup = next_wakeup(
+            now,
+            phase,
+            db_stats["start_time"],
+            db_stats["run_purchased"],
+            self._last_stats_attempt,
+            self._last_omega_check,
+        )
+        _LOGGER.debug("In %s phase, next update at %s", phase, wakeup)
+        self.update_interval = self._clock.to_real_delta(wakeup - now)
+        data = DesertBusData(
+            current_shift=current_shift,
+            now_bussing=db_stats["now_bussing"],
+            total_raised=db_stats["total_raised"],
+            start_time=db_stats["start_time"],
+            db_year=int(db_stats["db_year"]),
+            run_purchased=db_stats["run_purchased"],
+            next_hour_price_total=db_stats["next_hour_price_total"],
+            next_hour_price_remaining=db_stats["next_hour_price_remaining"],
+            stats_stale=self._stats_stale,
+            shift_stale=self._shift_stale,
+        )
+        self._async_save(data)
         if (
-            self.data is not None
-            and self.data.get("now_bussing")
-            and (now - self._last_omega_check >= RATE_LIMITS["OMEGA_SHIFT"])
+            self._replay is None
+            and not self._loading_years
+            and self._missing_years(data.db_year)
         ):
-            _LOGGER.debug("NEED TO UPDATE OMEGA SHIFT")
-            with urllib.request.urlopen(OMEGA_CHECK_URL) as omega_check:
-                self._last_omega_check = now
-                if int(omega_check.read().strip()) == 1:
-                    return SHIFTS.OMEGA
-        current_shift = None
-        bus_now = datetime.datetime.now(tz=BUS_TIMEZONE).time()
-        for (shift_start, shift_end), shift_name in self._shifts.items():
-            if shift_start <= bus_now < shift_end:
-                current_shift = shift_name
-        return current_shift
-
-    async def _async_update_data(self) -> dict[str, StateType]:
-        try:
-            db_stats = await self.hass.async_add_executor_job(self.get_stats)
-        except urllib.error.URLError as e:
-            _LOGGER.critical(e)
-        current_shift = await self.hass.async_add_executor_job(self.get_shift)
-        return {
-            "current_shift": current_shift,
-            "now_bussing": db_stats["now_bussing"],
-            "total_raised": db_stats["total_raised"],
-            "start_time": db_stats["start_time"],
-            "db_year": db_stats["db_year"],
-            "run_purchased": db_stats["run_purchased"],
-            "next_hour_price_total": db_stats["next_hour_price_total"],
-            "next_hour_price_remaining": db_stats["next_hour_price_remaining"],
-        }
+            self._loading_years = True
+            self.config_entry.async_create_background_task(
+                self.hass,
+                self._async_load_past_years(data.db_year),
+                f"{DOMAIN} past years",
+            )
+        return data
@@ -0,0 +1,56 @@
+"""Diagnostics support for Desert Bus."""
+
+from __future__ import annotations
+
+import dataclasses
+import typing
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+TO_REDACT = {"subscribe_key"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, config_entry: ConfigEntry
+) -> dict[str, typing.Any]:
+    """Return diagnostics for a config entry."""
+    entry_data = hass.data[DOMAIN][config_entry.entry_id]
+    coordinator = entry_data["coordinator"]
+    metrics = coordinator.metrics
+    diagnostics = {
+        "entry": async_redact_data(config_entry.as_dict(), TO_REDACT),
+        "coordinator": {
+            "phase": coordinator.phase,
+            "update_interval": str(coordinator.update_interval),
+            "last_update_success": coordinator.last_update_success,
+            "data": (
+                dataclasses.asdict(coordinator.data)
+                if coordinator.data is not None
+                else None
+            ),
+            "http_cache": coordinator.http_stats,
+            "breakers": {
+                endpoint: {
+                    "state": breaker.state,
+                    "failures": breaker.failures,
+                    "retry_at": breaker.retry_at,
+                }
+                for endpoint, breaker in coordinator.breakers.items()
+            },
+        },
+        "metrics": metrics.as_dict(),
+    }
+    if (api := entry_data.get("api")) is not None:
+        diagnostics["pubnub"] = {
+            "online": api.online,
+            "messages_received": api.messages_received,
+            "messages_per_second": metrics.per_second(api.messages_received),
+            "state_writes": api.state_writes,
+            "state_writes_per_second": metrics.per_second(api.state_writes),
+            "suppressed_writes": api.suppressed_writes,
+        }
+    return diagnostics
@@ -0,0 +1,79 @@
+"""Coalesced PubNub update notifications for the Home Assistant event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import collections.abc
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+
+from .metrics import Metrics
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CoalescingDispatcher:
+    """Merge bursts of notifications into at most one flush per interval.
+
+    Only the first notification of a burst schedules a flush, every later one
+    until the flush just bumps a counter.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        interval: float,
+        metrics: Metrics,
+        on_flush: collections.abc.Callable[[], None] | None = None,
+    ) -> None:
+        self._hass = hass
+        self._interval = interval
+        self._metrics = metrics
+        self._on_flush = on_flush
+        self._callbacks: set[collections.abc.Callable[[], None]] = set()
+        self._pending = False
+        self._last_flush = 0.0
+        self._timer: asyncio.TimerHandle | None = None
+        self.messages_received = 0
+
+    def register(self, call_back: collections.abc.Callable[[], None]) -> None:
+        self._callbacks.add(call_back)
+
+    def remove(self, call_back: collections.abc.Callable[[], None]) -> None:
+        self._callbacks.remove(call_back)
+
+    @callback
+    def async_notify(self) -> None:
+        self.messages_received += 1
+        if self._pending:
+            return
+        self._pending = True
+        delay = self._last_flush + self._interval - self._hass.loop.time()
+        if delay <= 0:
+            self._async_flush()
+        else:
+            self._timer = self._hass.loop.call_later(delay, self._async_flush)
+
+    @callback
+    def _async_flush(self) -> None:
+        self._timer = None
+        # Anything arriving from here on needs another flush
+        self._pending = False
+        self._last_flush = self._hass.loop.time()
+        if self._on_flush is not None:
+            self._on_flush()
+        with self._metrics.timer("fanout"):
+            for call_back in list(self._callbacks):
+                try:
+                    call_back()
+                except Exception:
+                    # One broken entity mustn't leave the others stale
+                    _LOGGER.exception("Error notifying %s of an update", call_back)
+
+    @callback
+    def async_shutdown(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._callbacks.clear()
@@ -0,0 +1,126 @@
+"""On-disk donation timeline, kept as two float64 columns."""
+
+from __future__ import annotations
+
+import bisect
+import mmap
+import os
+from array import array
+
+_ITEM_SIZE = array("d").itemsize
+
+
+def _read_column(path: str) -> tuple[mmap.mmap | None, memoryview]:
+    try:
+        with open(path, "rb") as column:
+            size = os.fstat(column.fileno()).st_size
+            if size < _ITEM_SIZE:
+                return None, memoryview(array("d"))
+            # Leave out a half-written last item, e.g. after a crash mid-append
+            mapped = mmap.mmap(
+                column.fileno(), size - size % _ITEM_SIZE, access=mmap.ACCESS_READ
+            )
+    except FileNotFoundError:
+        return None, memoryview(array("d"))
+    return mapped, memoryview(mapped).cast("d")
+
+
+class DonationHistory:
+    """Append-only (timestamp, total) columns in ``<path>.times``/``.totals``.
+
+    Every method does blocking file I/O and must run in the executor.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._times_path = f"{path}.times"
+        self._totals_path = f"{path}.totals"
+        self.last_timestamp: float | None = None
+
+    def load(self) -> None:
+        """Read the newest timestamp, trimming a half-written last append."""
+        sizes = []
+        for path in (self._times_path, self._totals_path):
+            try:
+                sizes.append(os.path.getsize(path))
+            except FileNotFoundError:
+                sizes.append(0)
+        count = min(sizes) // _ITEM_SIZE
+        for path, size in zip((self._times_path, self._totals_path), sizes):
+            if size != count * _ITEM_SIZE:
+                os.truncate(path, count * _ITEM_SIZE)
+        if not count:
+            self.last_timestamp = None
+            return
+        with open(self._times_path, "rb") as times:
+            times.seek((count - 1) * _ITEM_SIZE)
+            last = array("d")
+            last.frombytes(times.read(_ITEM_SIZE))
+        self.last_timestamp = last[0]
+
+    def append(self, times: array, totals: array) -> None:
+        """Append samples newer than anything already stored."""
+        if self.last_timestamp is not None:
+            skip = bisect.bisect_right(times, self.last_timestamp)
+            times, totals = times[skip:], totals[skip:]
+        if not times:
+            return
+        os.makedirs(os.path.dirname(self._times_path) or ".", exist_ok=True)
+        with open(self._totals_path, "ab") as column:
+            totals.tofile(column)
+        with open(self._times_path, "ab") as column:
+            times.tofile(column)
+        self.last_timestamp = times[-1]
+
+    def read(self) -> tuple[array, array]:
+        """Return every stored sample."""
+        columns = []
+        for path in (self._times_path, self._totals_path):
+            column = array("d")
+            try:
+                with open(path, "rb") as data:
+                    raw = data.read()
+            except FileNotFoundError:
+                raw = b""
+            column.frombytes(raw[: len(raw) - len(raw) % _ITEM_SIZE])
+            columns.append(column)
+        count = min(len(columns[0]), len(columns[1]))
+        return columns[0][:count], columns[1][:count]
+
+    def downsample(
+        self, start: float | None, end: float | None, points: int
+    ) -> tuple[list[float], list[float]]:
+        """Return up to points samples between start and end.
+
+        The range is split into equal buckets and the newest sample in each
+        bucket is kept, so steps in the total are never smoothed away.
+        """
+        times_map, times = _read_column(self._times_path)
+        totals_map, totals = _read_column(self._totals_path)
+        try:
+            count = min(len(times), len(totals))
+            if not count or points < 1:
+                return [], []
+            if start is None:
+                start = times[0]
+            if end is None:
+                end = times[count - 1]
+            low = bisect.bisect_left(times, start, 0, count)
+            high = bisect.bisect_right(times, end, 0, count)
+            out_times: list[float] = []
+            out_totals: list[float] = []
+            if low >= high:
+                return out_times, out_totals
+            step = (end - start) / points
+            for bucket in range(1, points + 1):
+                edge = end if bucket == points else start + bucket * step
+                index = bisect.bisect_right(times, edge, low, high) - 1
+                if index >= low and (not out_times or times[index] > out_times[-1]):
+                    out_times.append(times[index])
+                    out_totals.append(totals[index])
+            return out_times, out_totals
+        finally:
+            times.release()
+            totals.release()
+            for mapped in (times_map, totals_map):
+                if mapped is not None:
+                    mapped.close()
@@ -0,0 +1,106 @@
+"""Hourly long-term statistics for the live total, kept out of the states table."""
+
+from __future__ import annotations
+
+import dataclasses
+
+import homeassistant.util.dt as hass_dt
+from homeassistant.components.recorder.models import (StatisticData,
+                                                      StatisticMeanType,
+                                                      StatisticMetaData)
+from homeassistant.components.recorder.statistics import \
+    async_add_external_statistics
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN, STATISTICS_LATE_WINDOW
+
+STATISTIC_ID = f"{DOMAIN}:total_raised"
+
+_METADATA = StatisticMetaData(
+    has_sum=False,
+    mean_type=StatisticMeanType.ARITHMETIC,
+    name="Desert Bus Total Raised",
+    source=DOMAIN,
+    statistic_id=STATISTIC_ID,
+    unit_of_measurement="USD",
+)
+
+_HOUR = 3600
+
+
+@dataclasses.dataclass(slots=True)
+class _Bucket:
+    min: float
+    max: float
+    last: float
+    sum: float
+    count: int
+    # Changed since it was last written
+    dirty: bool = True
+
+
+class DonationStatistics:
+    """Aggregate live totals into hourly min/max/mean/last buckets.
+
+    Buckets are written as external statistics, each flush rewrites the
+    hours that changed since the last one. Written hours are kept for
+    STATISTICS_LATE_WINDOW so late samples are merged in rather than
+    replacing the hour with a partial bucket, older samples are dropped.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass = hass
+        self._buckets: dict[float, _Bucket] = {}
+        # Hours before this have been written and forgotten. To begin with
+        # that includes the current hour, an earlier run may have written it
+        # and a partial bucket would replace its statistic.
+        now = hass_dt.utcnow().timestamp()
+        self._cutoff = now - now % _HOUR + _HOUR
+
+    def add(self, timestamp: float, total: float) -> None:
+        hour = timestamp - timestamp % _HOUR
+        if hour < self._cutoff:
+            return
+        bucket = self._buckets.get(hour)
+        if bucket is None:
+            self._buckets[hour] = _Bucket(total, total, total, total, 1)
+            return
+        bucket.min = min(bucket.min, total)
+        bucket.max = max(bucket.max, total)
+        bucket.last = total
+        bucket.sum += total
+        bucket.count += 1
+        bucket.dirty = True
+
+    @callback
+    def async_flush(self, now: float) -> None:
+        changed = sorted(
+            (hour, bucket) for hour, bucket in self._buckets.items() if bucket.dirty
+        )
+        if changed:
+            self._write(changed)
+        self._cutoff = max(
+            self._cutoff,
+            now - now % _HOUR - STATISTICS_LATE_WINDOW.total_seconds(),
+        )
+        for hour in [hour for hour in self._buckets if hour < self._cutoff]:
+            del self._buckets[hour]
+
+    @callback
+    def _write(self, buckets: list[tuple[float, _Bucket]]) -> None:
+        async_add_external_statistics(
+            self._hass,
+            _METADATA,
+            [
+                StatisticData(
+                    start=hass_dt.utc_from_timestamp(hour),
+                    min=bucket.min,
+                    max=bucket.max,
+                    mean=bucket.sum / bucket.count,
+                    state=bucket.last,
+                )
+                for hour, bucket in buckets
+            ],
+        )
+        for _hour, bucket in buckets:
+            bucket.dirty = False
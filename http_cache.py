@@ -0,0 +1,99 @@
+"""Conditional request cache for the Desert Bus endpoints."""
+
+from __future__ import annotations
+
+import collections.abc
+import dataclasses
+import logging
+import time
+import typing
+
+import aiohttp
+from aiohttp import hdrs
+
+from .metrics import Metrics
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = typing.TypeVar("_T")
+
+
+@dataclasses.dataclass(slots=True)
+class _CacheEntry:
+    etag: str | None
+    last_modified: str | None
+    size: int
+    value: typing.Any
+
+
+class ConditionalCache:
+    """Remember ETag/Last-Modified per URL and reuse parsed results on a 304."""
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        timeout: aiohttp.ClientTimeout,
+        metrics: Metrics,
+    ) -> None:
+        self._session = session
+        self._timeout = timeout
+        self._metrics = metrics
+        self._entries: dict[str, _CacheEntry] = {}
+        self.hits = 0
+        self.misses = 0
+        self.bytes_fetched = 0
+        self.bytes_saved = 0
+
+    async def async_get(
+        self,
+        url: str,
+        parse: collections.abc.Callable[[bytes], collections.abc.Awaitable[_T]],
+    ) -> _T:
+        """Fetch url, only calling parse when the server sent a new body."""
+        headers = {}
+        entry = self._entries.get(url)
+        if entry is not None:
+            if entry.etag is not None:
+                headers[hdrs.IF_NONE_MATCH] = entry.etag
+            if entry.last_modified is not None:
+                headers[hdrs.IF_MODIFIED_SINCE] = entry.last_modified
+
+        start = time.perf_counter()
+        async with self._session.get(
+            url, headers=headers, timeout=self._timeout
+        ) as response:
+            if response.status == 304 and entry is not None:
+                self._metrics.observe(
+                    f"fetch_latency:{url}", time.perf_counter() - start
+                )
+                self.hits += 1
+                self.bytes_saved += entry.size
+                _LOGGER.debug("%s not modified, reusing cached result", url)
+                return typing.cast(_T, entry.value)
+            response.raise_for_status()
+            body = await response.read()
+            etag = response.headers.get(hdrs.ETAG)
+            last_modified = response.headers.get(hdrs.LAST_MODIFIED)
+        self._metrics.observe(f"fetch_latency:{url}", time.perf_counter() - start)
+
+        self.misses += 1
+        self.bytes_fetched += len(body)
+        self._metrics.increment(f"fetch_bytes:{url}", len(body))
+        with self._metrics.timer(f"parse_time:{url}"):
+            value = await parse(body)
+        if etag is None and last_modified is None:
+            # Nothing to revalidate against, don't hold on to the result
+            self._entries.pop(url, None)
+        else:
+            self._entries[url] = _CacheEntry(etag, last_modified, len(body), value)
+        return value
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bytes_fetched": self.bytes_fetched,
+            "bytes_saved": self.bytes_saved,
+            "entries": len(self._entries),
+        }
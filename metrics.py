@@ -0,0 +1,126 @@
+"""Always-on counters and timing histograms for the diagnostics download."""
+
+from __future__ import annotations
+
+import bisect
+import collections.abc
+import contextlib
+import time
+import typing
+from array import array
+
+# Upper bound of each histogram bucket in seconds, anything slower lands in
+# one extra overflow bucket
+_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+class Histogram:
+    """Fixed-bucket histogram, constant memory however many values it sees."""
+
+    __slots__ = ("_counts", "count", "total", "min", "max")
+
+    def __init__(self) -> None:
+        self._counts = array("q", bytes(8 * (len(_BUCKETS) + 1)))
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect.bisect_left(_BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-th value."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                if index == len(_BUCKETS):
+                    return self.max
+                return min(_BUCKETS[index], self.max)
+        return self.max
+
+    def as_dict(self) -> dict[str, float | int | None]:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": self.total / self.count,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class Metrics:
+    """Named counters and histograms shared by everything in a config entry."""
+
+    def __init__(self) -> None:
+        self._started = time.monotonic()
+        self.counters: dict[str, int] = {}
+        self.histograms: dict[str, Histogram] = {}
+
+    @property
+    def uptime(self) -> float:
+        return time.monotonic() - self._started
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, value: float) -> None:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(value)
+
+    @contextlib.contextmanager
+    def timer(self, name: str) -> collections.abc.Iterator[None]:
+        """Observe how long the body of the with block took."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def per_second(self, count: int) -> float:
+        """Average rate of count over the time since the metrics were created."""
+        uptime = self.uptime
+        return count / uptime if uptime > 0 else 0.0
+
+    def as_dict(self) -> dict[str, typing.Any]:
+        return {
+            "uptime": self.uptime,
+            "counters": dict(self.counters),
+            "histograms": {
+                name: histogram.as_dict()
+                for name, histogram in sorted(self.histograms.items())
+            },
+        }
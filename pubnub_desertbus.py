@@ -2,96 +2,712 @@
 
 from __future__ import annotations
 
+import asyncio
 import collections
+import datetime
 import logging
+import math
 import typing
 import urllib
 import uuid
+from array import array
 
-from homeassistant.helpers.typing import StateType
+import aiohttp
+import homeassistant.util.dt as hass_dt
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import (async_call_later,
+                                         async_track_time_interval)
 from pubnub.callbacks import SubscribeCallback
-from pubnub.enums import PNStatusCategory
+from pubnub.enums import (PNOperationType, PNReconnectionPolicy,
+                          PNStatusCategory)
+from pubnub.exceptions import PubNubException
+from pubnub.managers import ExponentialDelay, LinearDelay
 from pubnub.models.consumer.common import PNStatus
-from pubnub.models.consumer.history import PNFetchMessagesResult
 from pubnub.models.consumer.pubsub import PNMessageResult
+from pubnub.models.subscription import PubNubSubscriptionSet
 from pubnub.pnconfiguration import PNConfiguration
-from pubnub.pubnub import PubNub
+from pubnub.pubnub_asyncio import PubNubAsyncio
+from pubnub.request_handlers.async_aiohttp import AsyncAiohttpRequestHandler
+
+from .const import (EVENT_HOUR_PURCHASED, HISTORY_BATCH_SIZE,
+                    HISTORY_FLUSH_INTERVAL, HISTORY_PENDING_LIMIT,
+                    HISTORY_RETRY_BASE_DELAY, HISTORY_RETRY_MAX_DELAY,
+                    PROJECTION_REFRESH, PROJECTION_TIME_CONSTANT,
+                    PUBNUB_RESUBSCRIBE_DELAY, STATISTICS_FLUSH_INTERVAL,
+                    TIMELINE_CAPACITY)
+from .dispatch import CoalescingDispatcher
+from .history import DonationHistory
+from .metrics import Metrics
+from .storage import DesertBusStore
+from .timeline import DonationTimeline, EwmaRate
+from .util import BusMath, BusProjection, BusSnapshot
+
+if typing.TYPE_CHECKING:
+    from .hourly_stats import DonationStatistics
+    from .replay import ReplaySource, WallClock
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def timetoken_to_timestamp(timetoken: int | str) -> float:
+    """Convert a PubNub timetoken (100ns ticks) to a unix timestamp."""
+    return int(timetoken) / 10_000_000
+
+
+def _is_total(message: typing.Any) -> bool:
+    """Whether a message holds a usable total, JSON allows NaN and Infinity."""
+    return isinstance(message, (int, float)) and math.isfinite(message)
+
+
+def _shared_session_handler(
+    session: aiohttp.ClientSession,
+    on_subscribe_started: collections.abc.Callable[[], None],
+    on_subscribe_finished: collections.abc.Callable[[bool | None], None],
+) -> type[AsyncAiohttpRequestHandler]:
+    """Build a PubNub request handler that uses Home Assistant's aiohttp session.
+
+    The event engine reports nothing when a failed subscribe is retried, or
+    when a retry succeeds, so subscribe requests are reported from here.
+    on_subscribe_finished gets whether one succeeded, None if cancelled.
+    """
+
+    class SharedSessionRequestHandler(AsyncAiohttpRequestHandler):
+        async def create_session(self) -> None:
+            # The base class requests through _session, pinned to pubnub 10.x
+            self._session = session
+
+        async def close_session(self) -> None:
+            # The session belongs to Home Assistant, never close it
+            self._session = None
+
+        async def async_request(self, options_func, cancellation_event):
+            operation = options_func().operation_type
+            if operation != PNOperationType.PNSubscribeOperation:
+                return await super().async_request(options_func, cancellation_event)
+            on_subscribe_started()
+            try:
+                envelope = await super().async_request(
+                    options_func, cancellation_event
+                )
+            except asyncio.CancelledError:
+                on_subscribe_finished(None)
+                raise
+            except Exception:
+                on_subscribe_finished(False)
+                raise
+            # Nothing comes back for a request cancelled by the event engine
+            on_subscribe_finished(None if envelope is None else True)
+            return envelope
+
+    return SharedSessionRequestHandler
+
+
+def _retry_delay_bound(config: PNConfiguration) -> float:
+    """Longest the event engine waits before retrying a subscribe, in seconds."""
+    if config.reconnect_policy == PNReconnectionPolicy.NONE:
+        return 0.0
+    if config.reconnect_policy == PNReconnectionPolicy.EXPONENTIAL:
+        bound = config.maximum_reconnection_interval or ExponentialDelay.MAX_BACKOFF
+    else:
+        bound = config.reconnection_interval
+        if bound is None:
+            bound = LinearDelay.INTERVAL
+    # Either adds up to a second of jitter
+    return bound + 1.0
+
+
+# Reported when a subscribe request fails, not every pubnub 10.x release has
+# PNConnectionErrorCategory
+_DISCONNECTED_CATEGORIES = frozenset(
+    category
+    for name in (
+        "PNDisconnectedCategory",
+        "PNUnexpectedDisconnectCategory",
+        "PNConnectionErrorCategory",
+    )
+    if (category := getattr(PNStatusCategory, name, None)) is not None
+)
+
+
 class BusNubSubscribeCallback(SubscribeCallback):
     def __init__(self, bus: BusNub) -> None:
         super().__init__()
         self.bus = bus
 
-    def status(self, pubnub: PubNub, status: PNStatus) -> None:
-        if status.category == PNStatusCategory.PNUnexpectedDisconnectCategory:
+    def status(self, pubnub: PubNubAsyncio, status: PNStatus) -> None:
+        if status.category in _DISCONNECTED_CATEGORIES:
+            # The event engine retries failed requests itself, until it gives up
             _LOGGER.warning("PubNub disconnected")
-            pubnub.reconnect()
-        elif status.category == PNStatusCategory.PNTimeoutCategory:
-            _LOGGER.warning("PubNub timeout")
-            pubnub.reconnect()
+            self.bus.mark_gap()
+            self.bus.schedule_resubscribe()
+        elif status.category == PNStatusCategory.PNConnectedCategory:
+            self.bus.schedule_gap_fill()
 
-    def message(self, pubnub: PubNub, message: PNMessageResult) -> None:
+    def message(self, pubnub: PubNubAsyncio, message: PNMessageResult) -> None:
         total_raised = message.message
-        _LOGGER.debug("Total updated %f", total_raised)
-        self.bus.do_callbacks(total_raised)
+        _LOGGER.debug("Total on %s updated %s", message.channel, total_raised)
+        self.bus.handle_message(total_raised, int(message.timetoken), message.channel)
+
+
+class BusChannel:
+    """Latest total on an extra channel sharing BusNub's subscription."""
+
+    __slots__ = ("name", "total", "timetoken")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.total: float | None = None
+        self.timetoken = 0
+
+    def update(self, total: float, timetoken: int) -> bool:
+        """Apply a message, returns False if it was older than the last one."""
+        if timetoken <= self.timetoken:
+            return False
+        self.total = total
+        self.timetoken = timetoken
+        return True
 
 
 class BusNub:
-    def __init__(self, subscribe_key, channel) -> None:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        subscribe_key: str,
+        channel: str,
+        update_interval: float,
+        store: DesertBusStore,
+        history: DonationHistory,
+        metrics: Metrics,
+        clock: WallClock,
+        replay: ReplaySource | None = None,
+        statistics: DonationStatistics | None = None,
+        extra_channels: collections.abc.Iterable[str] = (),
+    ) -> None:
         self.pn_config = PNConfiguration()
         self.pn_config.user_id = str(uuid.uuid4())
         self.pn_config.subscribe_key = subscribe_key
-        self.pubnub: PubNub = None
-        self._callbacks: set = set()
-        self._data: dict[str, StateType] = {}
+        self.pubnub: PubNubAsyncio = None
+        self._subscription: PubNubSubscriptionSet | None = None
+        self._unsub_resubscribe: CALLBACK_TYPE | None = None
+        # Subscribe requests under way, and when the last one failed (loop
+        # time), None once one has succeeded since
+        self._subscribes_in_flight = 0
+        self._subscribe_failed_at: float | None = None
+        self._dispatcher = CoalescingDispatcher(
+            hass, update_interval, metrics, on_flush=self._async_save
+        )
+        self._hass = hass
+        self._metrics = metrics
+        self._clock = clock
+        self._replay = replay
+        self._statistics = statistics
+        self._unsub_statistics: CALLBACK_TYPE | None = None
+        self._store = store
+        self._history = history
+        self._history_ready = False
+        # Appends from the timer, the timeline service and the end of the
+        # backfill must not interleave, or the columns fall out of step
+        self._history_lock = asyncio.Lock()
+        self._pending_times = array("d")
+        self._pending_totals = array("d")
+        self._unsub_history: CALLBACK_TYPE | None = None
+        self._last_timestamp = 0.0
+        self._last_timetoken = 0
+        # Live messages are held back while missed ones are being applied
+        self._gap = False
+        self._filling = False
+        self._held: list[tuple[int, float]] = []
+        self._snapshot: BusSnapshot | None = None
+        self._timeline = DonationTimeline(TIMELINE_CAPACITY)
+        self._rate = EwmaRate(PROJECTION_TIME_CONSTANT.total_seconds())
+        # Projections only change with a new total or as the rate decays,
+        # reuse them until then
+        self._projection: BusProjection | None = None
+        self._projection_key: tuple[int, datetime.datetime, float] | None = None
+        # Total at which the next hour is bought, and the last hour announced.
+        # The first message only sets the baseline, so a restart doesn't
+        # announce every hour bought while it was down.
+        self._next_hour_threshold = 0.0
+        self._announced_hours: int | None = None
         self._pubnub_inited = False
         self._channel = channel
+        # Everything else on the subscribe key is multiplexed over the same
+        # subscription and routed here by channel name
+        self._channels = {
+            name: BusChannel(name) for name in extra_channels if name != channel
+        }
+        # A replay starts from its first recorded sample, a total saved by an
+        # earlier replay would be newer than everything it plays
+        if (
+            replay is None
+            and (saved_total := store.data.get("total_raised")) is not None
+        ):
+            # Serve the last known total until PubNub catches up
+            self._set_total(
+                saved_total, store.data.get("total_timestamp", 0.0), record=False
+            )
+            # Whatever was raised while it was down isn't a donation rate
+            self._timeline.mark_gap()
+            self._pubnub_inited = True
 
-    def init_api(self) -> None:
-        self.pubnub = PubNub(self.pn_config)
+    async def async_init_api(self) -> None:
+        if self._statistics is not None:
+            self._unsub_statistics = async_track_time_interval(
+                self._hass, self._async_flush_statistics, STATISTICS_FLUSH_INTERVAL
+            )
+        if self._replay is not None:
+            self._pubnub_inited = True
+            self._replay.async_start(BusNubSubscribeCallback(self), self._channel)
+            return
+        self.pubnub = PubNubAsyncio(
+            self.pn_config,
+            custom_event_loop=self._hass.loop,
+            custom_request_handler=_shared_session_handler(
+                async_get_clientsession(self._hass),
+                self._subscribe_started,
+                self._subscribe_finished,
+            ),
+        )
         self.pubnub.add_listener(BusNubSubscribeCallback(self))
-        total_channel = self.pubnub.channel(self._channel).subscription()
-        total_channel.subscribe()
-
-        def fetch_callback(envelope: PNFetchMessagesResult, status: PNStatus) -> None:
-            total_raised: float
-            _LOGGER.debug("PubNub request returned an status: %s", status.__dict__)
-            _LOGGER.warning("PubNub request returned an envelope: %s ", envelope.__dict__)
-            if status and status.is_error():
-                _LOGGER.warning("PubNub request returned an error!")
+        self._subscription = self.pubnub.subscription_set(
+            [
+                self.pubnub.channel(name).subscription()
+                for name in (self._channel, *self._channels)
+            ]
+        )
+        self._subscription.subscribe()
+        self._unsub_history = async_track_time_interval(
+            self._hass, self.async_flush_history, HISTORY_FLUSH_INTERVAL
+        )
+
+    async def async_fetch_latest(self) -> None:
+        """Apply the newest message on every channel from PubNub history.
+
+        Run in the background, until it finishes the sensors are served by
+        the saved total and whatever arrives on the subscription.
+        """
+        try:
+            page, _ = await self._async_fetch_history_page(0, None, count=1)
+        except (PubNubException, aiohttp.ClientError, TimeoutError) as err:
+            _LOGGER.warning("PubNub request returned an error: %s", err)
+            return
+        _LOGGER.debug("Latest PubNub message %s", page)
+        self._pubnub_inited = True
+        for timetoken, total_raised in page:
+            self.do_callbacks(total_raised, timetoken)
+        for name in self._channels:
+            try:
+                page, _ = await self._async_fetch_history_page(
+                    0, None, count=1, channel=name
+                )
+            except (PubNubException, aiohttp.ClientError, TimeoutError) as err:
+                _LOGGER.warning("Unable to fetch latest total on %s: %s", name, err)
+                continue
+            for timetoken, total_raised in page:
+                self.handle_message(total_raised, timetoken, name)
+
+    async def async_close_api(self) -> None:
+        self._dispatcher.async_shutdown()
+        if self._unsub_history is not None:
+            self._unsub_history()
+            self._unsub_history = None
+        if self._unsub_statistics is not None:
+            self._unsub_statistics()
+            self._unsub_statistics = None
+            self._async_flush_statistics()
+        if self._replay is not None:
+            self._replay.async_stop()
+        if self._unsub_resubscribe is not None:
+            self._unsub_resubscribe()
+            self._unsub_resubscribe = None
+        if self._subscription is not None:
+            self._subscription.unsubscribe()
+            self._subscription = None
+            await self.pubnub.stop()
+
+    async def _async_fetch_history_page(
+        self,
+        end: int,
+        start: int | None,
+        count: int = HISTORY_BATCH_SIZE,
+        channel: str | None = None,
+    ) -> tuple[list[tuple[int, float]], int | None]:
+        """Fetch the newest page of messages in [end, start), oldest first.
+
+        Also returns the timetoken to page back from, or None once the range
+        is exhausted.
+        """
+        channel = channel or self._channel
+        request = (
+            self.pubnub.fetch_messages().channels(channel).maximum_per_channel(count)
+        )
+        if end:
+            request = request.end(end)
+        if start is not None:
+            request = request.start(start)
+        result = await request.result()
+        items = result.channels.get(urllib.parse.quote(channel), [])
+        page = sorted(
+            (int(item.timetoken), float(item.message))
+            for item in items
+            if _is_total(item.message)
+        )
+        if len(items) < count:
+            return page, None
+        return page, min(int(item.timetoken) for item in items)
+
+    async def async_backfill(self, since: float) -> None:
+        """Copy PubNub message history since a unix time into the timeline file.
+
+        Pages come newest first and the file only takes newer samples, so it
+        walks back noting where each page starts, then forward again
+        appending each page as it is fetched. A restart carries on from the
+        last page appended.
+        """
+        await self._hass.async_add_executor_job(self._history.load)
+        if self._history.last_timestamp is not None:
+            since = max(since, self._history.last_timestamp)
+        end = int(since * 10_000_000) + 1
+        newest, start = await self._async_backfill_page(end, None)
+        oldest = newest
+        starts: list[int] = []
+        while start is not None:
+            page, older = await self._async_backfill_page(end, start)
+            if not page and older is None:
+                # The last page was full, but there's nothing before it
+                break
+            starts.append(start)
+            oldest, start = page, older
+        if starts:
+            # The oldest page, then each one between two starts. The newest
+            # is kept rather than fetched again, it may have grown since.
+            await self._async_append_history(oldest)
+            for lower, upper in zip(starts[:0:-1], starts[-2::-1]):
+                page, _ = await self._async_backfill_page(lower, upper)
+                await self._async_append_history(page)
+        await self._async_append_history(newest)
+        _LOGGER.debug("Backfilled %d pages of PubNub history", len(starts) + 1)
+        self._history_ready = True
+        await self.async_flush_history()
+
+    async def _async_backfill_page(
+        self, end: int, start: int | None
+    ) -> tuple[list[tuple[int, float]], int | None]:
+        """Fetch a history page, retrying until it comes back."""
+        delay = HISTORY_RETRY_BASE_DELAY
+        while True:
+            try:
+                return await self._async_fetch_history_page(end, start)
+            except (PubNubException, aiohttp.ClientError, TimeoutError) as err:
+                # Skipping the page would leave a hole nothing refills, live
+                # totals stay pending until it is fetched
+                _LOGGER.warning(
+                    "PubNub history backfill failed, retrying in %s: %s", delay, err
+                )
+                self._metrics.increment("history_retries")
+                await asyncio.sleep(delay.total_seconds())
+                delay = min(delay * 2, HISTORY_RETRY_MAX_DELAY)
+
+    async def _async_append_history(self, page: list[tuple[int, float]]) -> None:
+        if not page:
+            return
+        times = array("d", (timetoken_to_timestamp(tt) for tt, _ in page))
+        totals = array("d", (total for _, total in page))
+        async with self._history_lock:
+            await self._hass.async_add_executor_job(
+                self._history.append, times, totals
+            )
+
+    async def async_flush_history(self, _now: typing.Any = None) -> None:
+        """Write live totals received since the last flush to the timeline file."""
+        async with self._history_lock:
+            if not self._history_ready:
                 return
-            for channel_name, items in envelope.channels.items():
-                _LOGGER.debug("Got %s:%s", channel_name, items)
-                if channel_name == urllib.parse.quote(self._channel):
-                    total_raised = items[0].message
-            self._pubnub_inited = True
-            self.do_callbacks(total_raised)
+            times, totals = self._pending_times, self._pending_totals
+            self._pending_times, self._pending_totals = array("d"), array("d")
+            if times:
+                await self._hass.async_add_executor_job(
+                    self._history.append, times, totals
+                )
+
+    @callback
+    def _async_flush_statistics(self, _now: typing.Any = None) -> None:
+        assert self._statistics is not None
+        self._statistics.async_flush(self._clock.now().timestamp())
 
-        self.pubnub.fetch_messages().channels(self._channel).maximum_per_channel(
-            1
-        ).pn_async(fetch_callback)
+    @property
+    def statistics_mode(self) -> bool:
+        return self._statistics is not None
 
-    def close_api(self) -> None:
-        self.pubnub._subscription_manager.disconnect()
+    async def async_timeline(
+        self, start: float | None, end: float | None, points: int
+    ) -> tuple[list[float], list[float]]:
+        """Return a downsampled view of the stored timeline."""
+        await self.async_flush_history()
+        async with self._history_lock:
+            return await self._hass.async_add_executor_job(
+                self._history.downsample, start, end, points
+            )
+
+    @property
+    def clock(self) -> WallClock:
+        return self._clock
 
     @property
     def online(self) -> bool:
         return self._pubnub_inited
 
     def register_callback(self, call_back: collections.abc.Callable) -> None:
-        self._callbacks.add(call_back)
+        self._dispatcher.register(call_back)
 
     def remove_callback(self, call_back: collections.abc.Callable) -> None:
-        self._callbacks.remove(call_back)
+        self._dispatcher.remove(call_back)
+
+    def _set_total(
+        self, new_total: float, timestamp: float, record: bool = True
+    ) -> None:
+        # Derive everything the sensors need once, they only read fields
+        self._snapshot = BusSnapshot.from_total(new_total)
+        self._last_timestamp = timestamp
+        self._timeline.append(timestamp, new_total)
+        self._rate.update(timestamp, new_total)
+        if record:
+            if len(self._pending_times) >= HISTORY_PENDING_LIMIT:
+                # Only while the backfill holds up flushing. Coarser samples
+                # beat growing without bound, the timeline is downsampled
+                # for display anyway.
+                self._pending_times = self._pending_times[::2]
+                self._pending_totals = self._pending_totals[::2]
+            self._pending_times.append(timestamp)
+            self._pending_totals.append(new_total)
+
+    def do_callbacks(self, new_total: float, timetoken: int) -> None:
+        if timetoken <= self._last_timetoken:
+            # Already applied, e.g. seen live and again while filling a gap
+            return
+        self._last_timetoken = timetoken
+        self._pubnub_inited = True
+        timestamp = timetoken_to_timestamp(timetoken)
+        # Replayed totals are already in the timeline file
+        self._set_total(new_total, timestamp, record=self._replay is None)
+        if new_total >= self._next_hour_threshold:
+            self._announce_hours(timestamp)
+        if self._statistics is not None:
+            self._statistics.add(timestamp, new_total)
+        self._dispatcher.async_notify()
+
+    def _announce_hours(self, timestamp: float) -> None:
+        assert self._snapshot is not None
+        hours = self._snapshot.hours_purchased
+        if self._announced_hours is not None:
+            # One donation can buy several hours, each gets its own event
+            time_fired = hass_dt.utc_from_timestamp(timestamp).isoformat()
+            for hour in range(self._announced_hours + 1, hours + 1):
+                self._hass.bus.async_fire(
+                    EVENT_HOUR_PURCHASED, {"hour": hour, "timestamp": time_fired}
+                )
+        # Never announce an hour twice, even if the total dips and recovers
+        if self._announced_hours is None or hours > self._announced_hours:
+            self._announced_hours = hours
+        self._next_hour_threshold = BusMath.hours_to_dollars(self._announced_hours + 1)
+
+    def handle_message(
+        self, new_total: float, timetoken: int, channel: str | None = None
+    ) -> None:
+        if channel is not None and channel != self._channel:
+            self._handle_channel_message(channel, new_total, timetoken)
+            return
+        if not _is_total(new_total):
+            _LOGGER.debug("Ignoring message %r on %s", new_total, self._channel)
+            return
+        # Publish to receive, includes any clock skew between us and PubNub
+        self._metrics.observe(
+            "pubnub_lag",
+            self._clock.now().timestamp() - timetoken_to_timestamp(timetoken),
+        )
+        # The first message after reconnecting, PubNub only catches up on a
+        # limited number of the ones missed
+        self.schedule_gap_fill()
+        if self._filling:
+            self._held.append((timetoken, new_total))
+            return
+        self.do_callbacks(new_total, timetoken)
 
-    def do_callbacks(self, new_total: float) -> None:
-        self._data["total_raised"] = new_total
-        for callback in self._callbacks:
-            callback()
+    def _handle_channel_message(
+        self, channel: str, new_total: typing.Any, timetoken: int
+    ) -> None:
+        if (bus_channel := self._channels.get(channel)) is None:
+            return
+        if not _is_total(new_total):
+            _LOGGER.debug("Ignoring message %r on %s", new_total, channel)
+            return
+        if bus_channel.update(float(new_total), timetoken):
+            self._dispatcher.async_notify()
+
+    @property
+    def channels(self) -> dict[str, BusChannel]:
+        return self._channels
+
+    def mark_gap(self) -> None:
+        self._gap = True
+        self._timeline.mark_gap()
+
+    @callback
+    def _subscribe_started(self) -> None:
+        self._subscribes_in_flight += 1
+
+    @callback
+    def _subscribe_finished(self, succeeded: bool | None) -> None:
+        self._subscribes_in_flight -= 1
+        if succeeded:
+            self._subscribe_failed_at = None
+        elif succeeded is not None:
+            self._subscribe_failed_at = self._hass.loop.time()
+            self.mark_gap()
+
+    def schedule_resubscribe(self) -> None:
+        """Check back later whether PubNub has given up reconnecting."""
+        if self._subscription is None or self._unsub_resubscribe is not None:
+            return
+        # Not from the status callback itself, it runs inside an event engine
+        # transition
+        self._unsub_resubscribe = async_call_later(
+            self._hass, PUBNUB_RESUBSCRIBE_DELAY, self._async_resubscribe
+        )
+
+    @callback
+    def _async_resubscribe(self, _now: typing.Any) -> None:
+        """Subscribe the channels again, from the newest message seen on any."""
+        self._unsub_resubscribe = None
+        if (
+            self._subscription is None
+            or self._subscribes_in_flight
+            or self._subscribe_failed_at is None
+        ):
+            # Connected, or a retry is under way and will report how it went
+            return
+        quiet = self._hass.loop.time() - self._subscribe_failed_at
+        if quiet < max(
+            PUBNUB_RESUBSCRIBE_DELAY.total_seconds(),
+            _retry_delay_bound(self.pn_config),
+        ):
+            # Maybe between retries, once it has given up there are no more.
+            # Subscribing again meanwhile would leave two retries running.
+            self.schedule_resubscribe()
+            return
+        timetoken = max(
+            [self._last_timetoken, *(c.timetoken for c in self._channels.values())]
+        )
+        _LOGGER.debug("Subscribing to PubNub again from %d", timetoken)
+        # Unsubscribing first keeps the set from being registered twice
+        self._subscription.unsubscribe()
+        self._subscription.subscribe(timetoken=timetoken or None)
+
+    def schedule_gap_fill(self) -> None:
+        if not self._gap or self._filling:
+            return
+        self._gap = False
+        if not self._last_timetoken:
+            # Nothing seen yet to fill from, async_fetch_latest covers it
+            return
+        self._filling = True
+        self._hass.async_create_background_task(
+            self._async_fill_gap(), "desertbus pubnub gap fill"
+        )
+
+    async def _async_fill_gap(self) -> None:
+        """Apply every message published since the last one seen, oldest first."""
+        pages: list[list[tuple[int, float]]] = []
+        start: int | None = None
+        try:
+            while True:
+                page, start = await self._async_fetch_history_page(
+                    self._last_timetoken + 1, start
+                )
+                pages.append(page)
+                if start is None:
+                    break
+            # Everything missed is applied below, so the samples from before
+            # the gap are still a baseline for the donation rate
+            self._timeline.unmark_gap()
+        except (PubNubException, aiohttp.ClientError, TimeoutError) as err:
+            _LOGGER.warning("Unable to fetch messages missed while offline: %s", err)
+        finally:
+            for page in reversed(pages):
+                for timetoken, total in page:
+                    self.do_callbacks(total, timetoken)
+            for timetoken, total in sorted(self._held):
+                self.do_callbacks(total, timetoken)
+            self._held = []
+            self._filling = False
+        _LOGGER.debug("Filled PubNub gap with %d messages", sum(map(len, pages)))
+
+    @callback
+    def _async_save(self) -> None:
+        if self._replay is None and self._snapshot is not None:
+            self._store.async_update(
+                total_raised=self._snapshot.total_raised,
+                total_timestamp=self._last_timestamp,
+            )
+
+    @property
+    def messages_received(self) -> int:
+        return self._dispatcher.messages_received
+
+    @property
+    def state_writes(self) -> int:
+        return self._metrics.counters.get("state_writes", 0)
+
+    @property
+    def suppressed_writes(self) -> int:
+        return self._metrics.counters.get("suppressed_writes", 0)
+
+    def count_write(self, key: str) -> None:
+        """Count a state an entity wrote to Home Assistant."""
+        self._metrics.increment("state_writes")
+        self._metrics.increment(f"state_writes:{key}")
+
+    def count_suppressed(self, key: str) -> None:
+        """Count a state write an entity skipped because nothing changed."""
+        self._metrics.increment("suppressed_writes")
+        self._metrics.increment(f"suppressed_writes:{key}")
+
+    @property
+    def has_total(self) -> bool:
+        """Whether a main channel total has been received or restored."""
+        return self._snapshot is not None
+
+    @property
+    def snapshot(self) -> BusSnapshot:
+        assert self._snapshot is not None
+        return self._snapshot
 
     @property
     def total_raised(self) -> float:
-        return self._data["total_raised"]
+        return self.snapshot.total_raised
+
+    def projection(self, start_time: datetime.datetime) -> BusProjection | None:
+        """Project the run from the smoothed donation rate, None without one."""
+        now = self._clock.now().timestamp()
+        key = (
+            self._last_timetoken,
+            start_time,
+            now // PROJECTION_REFRESH.total_seconds(),
+        )
+        if key == self._projection_key:
+            return self._projection
+        if self._snapshot is None or (rate := self._rate.rate_at(now)) is None:
+            return None
+        self._projection = BusProjection.from_rate(
+            self._snapshot.total_raised, rate, start_time.timestamp(), now
+        )
+        self._projection_key = key
+        return self._projection
+
+    def donation_rate(self, minutes: int) -> float | None:
+        """Average dollars per minute raised over the last few minutes."""
+        rate = self._timeline.rate(minutes * 60, self._clock.now().timestamp())
+        if rate is None:
+            return None
+        return round(rate * 60, 2)
@@ -0,0 +1,144 @@
+"""Replay a recorded donation timeline in place of the live PubNub feed."""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import datetime
+import logging
+import time
+import typing
+from array import array
+
+import homeassistant.util.dt as hass_dt
+from homeassistant.core import HomeAssistant, callback
+
+from .const import BUS_TIMEZONE
+from .history import DonationHistory
+from .util import BusMath
+
+if typing.TYPE_CHECKING:
+    from pubnub.callbacks import SubscribeCallback
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class WallClock:
+    """Real time, used whenever nothing is being replayed."""
+
+    def now(self) -> datetime.datetime:
+        return hass_dt.now()
+
+    def to_real(self, moment: datetime.datetime) -> datetime.datetime:
+        """Return the wall clock time at which moment comes around."""
+        return moment
+
+    def to_real_delta(self, delta: datetime.timedelta) -> datetime.timedelta:
+        return delta
+
+
+class ReplayClock(WallClock):
+    """Time that starts at the first replayed sample and runs speed times fast."""
+
+    def __init__(self, start: datetime.datetime, speed: float) -> None:
+        self._start = start
+        self._speed = speed
+        self._real_start = time.monotonic()
+
+    def now(self) -> datetime.datetime:
+        elapsed = (time.monotonic() - self._real_start) * self._speed
+        return self._start + datetime.timedelta(seconds=elapsed)
+
+    def to_real(self, moment: datetime.datetime) -> datetime.datetime:
+        return hass_dt.now() + (moment - self.now()) / self._speed
+
+    def to_real_delta(self, delta: datetime.timedelta) -> datetime.timedelta:
+        return delta / self._speed
+
+
+class ReplaySource:
+    """Publish recorded totals to a PubNub listener at the replay clock's pace.
+
+    Messages go through the listener's ``message`` method exactly as live
+    ones do, so everything behind it sees a normal run, only faster.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, times: array, totals: array, speed: float
+    ) -> None:
+        self._hass = hass
+        self._times = times
+        self._totals = totals
+        self._speed = speed
+        self.start = datetime.datetime.fromtimestamp(times[0], datetime.UTC)
+        self.clock = ReplayClock(self.start, speed)
+        self._next = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._listener: SubscribeCallback | None = None
+        self._channel = ""
+
+    @classmethod
+    async def async_load(
+        cls, hass: HomeAssistant, path: str, speed: float
+    ) -> ReplaySource:
+        """Read a timeline recorded by DonationHistory."""
+        times, totals = await hass.async_add_executor_job(DonationHistory(path).read)
+        if not times:
+            raise ValueError(f"No donation samples recorded at {path}")
+        _LOGGER.info(
+            "Replaying %d samples from %s at %gx speed", len(times), path, speed
+        )
+        return cls(hass, times, totals, speed)
+
+    def total_at(self, timestamp: float) -> float:
+        index = bisect.bisect_right(self._times, timestamp)
+        return self._totals[max(index - 1, 0)]
+
+    def stats(self, year: int) -> dict:
+        """DB stats as the stats JSON would have reported them at replay time."""
+        total = self.total_at(self.clock.now().timestamp())
+        start = self.start.astimezone(BUS_TIMEZONE).replace(tzinfo=None)
+        return {
+            "Year Start Date-Time": start.isoformat(),
+            "Year Number": year,
+            "Max Hour Purchased": BusMath.dollars_to_hours(total),
+            "Total Raised": total,
+        }
+
+    @callback
+    def async_start(self, listener: SubscribeCallback, channel: str) -> None:
+        self._listener = listener
+        self._channel = channel
+        self._async_emit()
+
+    @callback
+    def async_stop(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    @callback
+    def _async_emit(self) -> None:
+        # BusNub has pulled in the PubNub SDK before a replay starts, so
+        # this import is only a lookup
+        from pubnub.models.consumer.pubsub import PNMessageResult
+
+        self._timer = None
+        assert self._listener is not None
+        now = self.clock.now().timestamp()
+        while self._next < len(self._times) and self._times[self._next] <= now:
+            self._listener.message(
+                None,
+                PNMessageResult(
+                    message=self._totals[self._next],
+                    subscription=None,
+                    channel=self._channel,
+                    timetoken=int(self._times[self._next] * 10_000_000),
+                ),
+            )
+            self._next += 1
+        if self._next == len(self._times):
+            _LOGGER.info("Replay finished")
+            return
+        delay = (self._times[self._next] - now) / self._speed
+        self._timer = self._hass.loop.call_later(delay, self._async_emit)
@@ -0,0 +1,75 @@
+"""When the coordinator needs to wake up, depending on where we are in the year."""
+
+from __future__ import annotations
+
+import datetime
+
+from .const import MIN_UPDATE_INTERVAL, PHASE_STATS_INTERVALS, PHASES, RATE_LIMITS
+
+
+def run_end(start_time: datetime.datetime, run_purchased: int) -> datetime.datetime:
+    return start_time + datetime.timedelta(hours=run_purchased)
+
+
+def is_bussing(
+    now: datetime.datetime, start_time: datetime.datetime, run_purchased: int
+) -> bool:
+    return run_end(start_time, run_purchased) > now >= start_time
+
+
+def get_phase(
+    now: datetime.datetime,
+    start_time: datetime.datetime | None,
+    run_purchased: int,
+) -> str:
+    """Work out which part of the Desert Bus year now falls in."""
+    if start_time is None:
+        return PHASES.PRE_ANNOUNCEMENT if now.month == 11 else PHASES.OFF_SEASON
+    if now < start_time:
+        return PHASES.PRE_RUN
+    if now < run_end(start_time, run_purchased):
+        return PHASES.RUNNING
+    if run_purchased == 0 and start_time.year == now.year:
+        # Scraped start time, the stats JSON just hasn't caught up yet
+        return PHASES.RUNNING
+    if now.month != 11:
+        return PHASES.OFF_SEASON
+    if start_time.year < now.year:
+        # Still showing last year's run, wait for this year's to be announced
+        return PHASES.PRE_ANNOUNCEMENT
+    return PHASES.POST_RUN
+
+
+def _next_november(now: datetime.datetime) -> datetime.datetime:
+    year = now.year if now.month < 11 else now.year + 1
+    return now.replace(
+        year=year, month=11, day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+
+
+def next_wakeup(
+    now: datetime.datetime,
+    phase: str,
+    start_time: datetime.datetime | None,
+    run_purchased: int,
+    last_stats_attempt: datetime.datetime,
+    last_omega_check: datetime.datetime,
+) -> datetime.datetime:
+    """Return when the coordinator next has something to do.
+
+    Stats are checked again a phase's interval after the last attempt, whether
+    or not it found anything.
+    """
+    candidates = [last_stats_attempt + PHASE_STATS_INTERVALS[phase]]
+    if phase == PHASES.OFF_SEASON:
+        candidates.append(_next_november(now))
+    elif phase == PHASES.PRE_RUN and start_time is not None:
+        candidates.append(start_time)
+    elif (
+        phase == PHASES.RUNNING
+        and start_time is not None
+        and is_bussing(now, start_time, run_purchased)
+    ):
+        candidates.append(last_omega_check + RATE_LIMITS["OMEGA_SHIFT"])
+        candidates.append(run_end(start_time, run_purchased))
+    return max(min(candidates), now + MIN_UPDATE_INTERVAL)
@@ -0,0 +1,114 @@
+"""Streaming extractor for the start time and total on the desertbus.org page."""
+
+from __future__ import annotations
+
+import dateutil.parser
+import lxml.etree
+
+# Bytes handed to the parser at a time; parsing stops at the first chunk
+# boundary after both values have been seen.
+CHUNK_SIZE = 8192
+
+_LABEL_CLASSES = frozenset(("text-xs", "text-brand-gold"))
+_START_MARKER = "Begins "
+_RAISED_MARKER = " Total Raised"
+
+
+class _DBPageTarget:
+    """lxml parser target matching ``div .text-xs.text-brand-gold`` labels.
+
+    Only the leading text of each label (and of the element following the
+    "Total Raised" label) is kept, no tree is ever built.
+    """
+
+    def __init__(self) -> None:
+        self.start_text: str | None = None
+        self.raised_text: str | None = None
+        self._depth = 0
+        self._div_depth = 0
+        # Element whose leading text is being collected
+        self._capture: list[str] | None = None
+        self._capture_depth = 0
+        self._capture_is_label = False
+        # Depth of the "Total Raised" label while it is still open, and the
+        # depth its next sibling will open at once it has closed
+        self._raised_label_depth: int | None = None
+        self._sibling_depth: int | None = None
+
+    @property
+    def done(self) -> bool:
+        return self.start_text is not None and self.raised_text is not None
+
+    def start(self, tag: str, attrib: dict[str, str]) -> None:
+        if self._capture is not None:
+            # A child element ends the leading text of the captured element
+            self._finish_capture()
+        self._depth += 1
+        if self._sibling_depth == self._depth:
+            self._sibling_depth = None
+            self._begin_capture(is_label=False)
+        elif self._div_depth and _LABEL_CLASSES.issubset(
+            attrib.get("class", "").split()
+        ):
+            self._begin_capture(is_label=True)
+        if tag == "div":
+            self._div_depth += 1
+
+    def end(self, tag: str) -> None:
+        if self._capture is not None and self._capture_depth == self._depth:
+            self._finish_capture()
+        if tag == "div":
+            self._div_depth -= 1
+        if self._raised_label_depth == self._depth:
+            self._raised_label_depth = None
+            self._sibling_depth = self._depth
+        self._depth -= 1
+        if self._sibling_depth is not None and self._depth < self._sibling_depth - 1:
+            # The label's parent closed without another element after it
+            self._sibling_depth = None
+
+    def data(self, text: str) -> None:
+        if self._capture is not None:
+            self._capture.append(text)
+
+    def close(self) -> None:
+        return None
+
+    def _begin_capture(self, is_label: bool) -> None:
+        self._capture = []
+        self._capture_depth = self._depth
+        self._capture_is_label = is_label
+
+    def _finish_capture(self) -> None:
+        text = "".join(self._capture or ())
+        self._capture = None
+        if not self._capture_is_label:
+            if self.raised_text is None:
+                self.raised_text = text
+            return
+        loc = text.find(_START_MARKER)
+        if loc != -1:
+            self.start_text = text[loc + len(_START_MARKER) :]
+        if text.find(_RAISED_MARKER) != -1:
+            self._raised_label_depth = self._capture_depth
+
+
+def parse_db_page(page: bytes) -> dict:
+    """Pull the run start time and current total out of a desertbus.org page."""
+    target = _DBPageTarget()
+    parser = lxml.etree.HTMLParser(target=target)
+    for offset in range(0, len(page), CHUNK_SIZE):
+        parser.feed(page[offset : offset + CHUNK_SIZE])
+        if target.done:
+            break
+    parser.close()
+
+    if target.start_text is None or target.raised_text is None:
+        raise ValueError("Start time or total not found on DB page")
+    start_time = dateutil.parser.parse(target.start_text, ignoretz=True)
+    raised_text = target.raised_text
+    total_raised = raised_text[raised_text.find("$") + 1 :]
+    return {
+        "start-time": start_time.isoformat(),
+        "total-raised": total_raised.strip().replace(",", ""),
+    }
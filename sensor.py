@@ -2,26 +2,42 @@
 
 from __future__ import annotations
 
+import asyncio
+import datetime
+import importlib
 import logging
+import time
 import typing
 
 import homeassistant.const as ha_const
+import homeassistant.util.dt as hass_dt
 from homeassistant.components.sensor import (SensorDeviceClass, SensorEntity,
                                              SensorStateClass)
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import STORAGE_DIR
 from homeassistant.helpers.typing import (UNDEFINED, ConfigType,
                                           DiscoveryInfoType, StateType,
                                           UndefinedType)
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import slugify
 
 # from . import DesertBus
-from .const import DOMAIN, SHIFTS
+from .const import (CONF_EXTRA_CHANNELS, CONF_MAX_STATE_AGE, CONF_MIN_DELTA,
+                    CONF_STATISTICS_MODE, CONF_UPDATE_INTERVAL,
+                    DEFAULT_MAX_STATE_AGE, DEFAULT_MIN_DELTA,
+                    DEFAULT_UPDATE_INTERVAL, DOMAIN, HISTORY_FILE,
+                    PROJECTION_REFRESH, RATE_REFRESHES_PER_WINDOW, SHIFTS,
+                    STATISTICS_STATE_INTERVAL)
 from .coordinator import DesertBusUpdateCoordinator
-from .pubnub_desertbus import BusNub
-from .util import BusMath
+from .history import DonationHistory
+
+if typing.TYPE_CHECKING:
+    from .pubnub_desertbus import BusChannel, BusNub
+    from .util import BusProjection
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -35,23 +51,80 @@ async def async_setup_entry(
     """Set up the sensor platform."""
     _LOGGER.debug(config_entry.data)
     coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
-    bus_api = BusNub(
+    # The PubNub SDK is large, import it without blocking the event loop
+    pubnub_desertbus = await hass.async_add_import_executor_job(
+        importlib.import_module, f"{__package__}.pubnub_desertbus"
+    )
+    replay = hass.data[DOMAIN][config_entry.entry_id]["replay"]
+    statistics = None
+    # Replayed totals must not end up in the real run's statistics
+    if config_entry.options.get(CONF_STATISTICS_MODE) and replay is None:
+        hourly_stats = await hass.async_add_import_executor_job(
+            importlib.import_module, f"{__package__}.hourly_stats"
+        )
+        statistics = hourly_stats.DonationStatistics(hass)
+    bus_api = pubnub_desertbus.BusNub(
+        hass,
         subscribe_key=config_entry.data["subscribe_key"],
         channel=config_entry.data["channel"],
+        update_interval=config_entry.options.get(
+            CONF_UPDATE_INTERVAL, DEFAULT_UPDATE_INTERVAL
+        ),
+        store=hass.data[DOMAIN][config_entry.entry_id]["store"],
+        history=DonationHistory(hass.config.path(STORAGE_DIR, HISTORY_FILE)),
+        metrics=coordinator.metrics,
+        clock=coordinator.clock,
+        replay=replay,
+        statistics=statistics,
+        extra_channels=[
+            name.strip()
+            for name in config_entry.options.get(CONF_EXTRA_CHANNELS, "").split(",")
+            if name.strip()
+        ],
     )
     hass.data.setdefault(DOMAIN, {})[config_entry.entry_id]["api"] = bus_api
+    # Hour counts only ever move by whole hours, the delta is in dollars
+    min_delta = config_entry.options.get(CONF_MIN_DELTA, DEFAULT_MIN_DELTA)
+    max_age = config_entry.options.get(CONF_MAX_STATE_AGE, DEFAULT_MAX_STATE_AGE)
     add_entities(
         [
             ShiftSensor(coordinator),
             CurrentlyBussingSensor(coordinator),
             YearSensor(coordinator),
             StartSensor(coordinator),
-            HoursSensor(bus_api),
-            HoursCostSensor(bus_api),
-            RaisedSensor(bus_api),
+            HoursSensor(bus_api, max_age=max_age),
+            HoursCostSensor(bus_api, min_delta, max_age),
+            RaisedSensor(bus_api, min_delta, max_age),
+            DonationRate1mSensor(bus_api, min_delta, max_age),
+            DonationRate5mSensor(bus_api, min_delta, max_age),
+            DonationRate60mSensor(bus_api, min_delta, max_age),
+            RaisedVsPreviousFinalSensor(bus_api, coordinator, min_delta, max_age),
+            HoursVsPreviousFinalSensor(bus_api, coordinator, max_age=max_age),
+            ProjectedRaisedSensor(bus_api, coordinator, min_delta, max_age),
+            ProjectedHoursSensor(bus_api, coordinator, max_age=max_age),
+            ProjectedEndSensor(bus_api, coordinator, max_age=max_age),
+            NextHourSensor(bus_api, coordinator, max_age=max_age),
+        ]
+        + [
+            ChannelRaisedSensor(bus_api, channel, min_delta, max_age)
+            for channel in bus_api.channels.values()
         ]
     )
-    bus_api.init_api()
+    await bus_api.async_init_api()
+    if replay is not None:
+        return
+
+    config_entry.async_create_background_task(
+        hass, bus_api.async_fetch_latest(), f"{DOMAIN} latest total"
+    )
+
+    # Fill the on-disk timeline back to the start of the latest run
+    since = time.time()
+    if coordinator.data is not None:
+        since = min(since, coordinator.data.start_time.timestamp())
+    config_entry.async_create_background_task(
+        hass, bus_api.async_backfill(since), f"{DOMAIN} history backfill"
+    )
 
 
 class BusSensor(CoordinatorEntity):
@@ -59,6 +132,8 @@ class BusSensor(CoordinatorEntity):
     _attr_should_poll = False
 
     _key: str = "undefined"
+    # Data key telling whether the value is being served from an earlier fetch
+    _stale_key = "stats_stale"
     _attr_state_class = SensorStateClass.MEASUREMENT
 
     def __init__(self, coordinator: DesertBusUpdateCoordinator) -> None:
@@ -73,7 +148,11 @@ class BusSensor(CoordinatorEntity):
 
     @property
     def state(self) -> StateType:
-        return self.coordinator.data[self._key]
+        return getattr(self.coordinator.data, self._key)
+
+    @property
+    def extra_state_attributes(self):
+        return {"stale": getattr(self.coordinator.data, self._stale_key)}
 
 
 class CurrentlyBussingSensor(BusSensor):
@@ -85,6 +164,7 @@ class ShiftSensor(BusSensor):
     """Desert Bus Shift Sensor"""
 
     _key = "current_shift"
+    _stale_key = "shift_stale"
 
     _attr_name = "Deset Bus Current Shift"
     _attr_options = [
@@ -125,6 +205,7 @@ class ShiftSensor(BusSensor):
     @property
     def extra_state_attributes(self):
         return {
+            **super().extra_state_attributes,
             "color_primary": self._shift_colors[self.state]["primary"],
             "color_secondary": self._shift_colors[self.state]["secondary"],
             "color_tertiary": self._shift_colors[self.state]["tertiary"],
@@ -148,8 +229,16 @@ class FastBusSensor(SensorEntity):
         raise NotImplementedError
 
     should_poll = False
+    # Attributes that follow the value, left out when deciding whether a
+    # write would change anything
+    _derived_attributes: frozenset[str] = frozenset()
 
-    def __init__(self, bus_api: BusNub) -> None:
+    def __init__(
+        self,
+        bus_api: BusNub,
+        min_delta: float = DEFAULT_MIN_DELTA,
+        max_age: float = DEFAULT_MAX_STATE_AGE,
+    ) -> None:
         """Initialize the sensor."""
         # Usual setup is done here. Callbacks are added in async_added_to_hass.
         self.entity_id = "sensor.desertbus_{}".format(self._key)
@@ -160,6 +249,11 @@ class FastBusSensor(SensorEntity):
             identifiers={(DOMAIN, "desertbus")},
         )
         self._api = bus_api
+        self._min_delta = min_delta
+        self._max_age = max_age
+        # Value, attributes and availability last written, and when
+        self._written: tuple[StateType, typing.Any, bool] | None = None
+        self._written_at = 0.0
 
     async def async_added_to_hass(
         self,
@@ -171,20 +265,68 @@ class FastBusSensor(SensorEntity):
         # registercallback method, so to this we add the
         # 'self.async_write_ha_state' method, to be called where ever there are
         # changes.  The call back registration is done once this entity is
-        # registered with HA (rather than in the __init__)
-        self._api.register_callback(self.schedule_update_ha_state)
+        # registered with HA (rather than in the __init__). BusNub coalesces
+        # bursts of messages, and writes that change nothing are skipped.
+        self._api.register_callback(self._async_write_if_changed)
 
     async def async_will_remove_from_hass(self) -> None:
         """Entity being removed from hass."""
         # The opposite of async_added_to_hass. Remove any registered call backs here.
-        self._api.remove_callback(self.schedule_update_ha_state)
+        self._api.remove_callback(self._async_write_if_changed)
+
+    @callback
+    def _async_refresh(self, _now: datetime.datetime) -> None:
+        self._async_write_if_changed()
+
+    def _is_close(self, value: StateType, written: StateType) -> bool:
+        if value == written:
+            return True
+        if not self._min_delta or value is None or written is None:
+            return False
+        return abs(float(value) - float(written)) < self._min_delta
+
+    @callback
+    def _async_write_if_changed(self) -> None:
+        """Write the state unless it matches the last write closely enough."""
+        available = self.available
+        if available:
+            value = self.native_value
+            attributes = self.extra_state_attributes
+            if self._derived_attributes and attributes:
+                attributes = {
+                    name: attribute
+                    for name, attribute in attributes.items()
+                    if name not in self._derived_attributes
+                }
+        else:
+            # Unavailable states carry neither, and there may be no total yet
+            value = attributes = None
+        now = self.hass.loop.time()
+        if self._written is not None and now - self._written_at < self._max_age:
+            written_value, written_attributes, written_available = self._written
+            if (
+                available == written_available
+                and attributes == written_attributes
+                and self._is_close(value, written_value)
+            ):
+                self._api.count_suppressed(self._key)
+                return
+        self._written = (value, attributes, available)
+        self._written_at = now
+        self.async_write_ha_state()
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        """Write the state, counting every write whichever path it comes from."""
+        self._api.count_write(self._key)
+        super().async_write_ha_state()
 
     # This property is important to let HA know if this entity is online or not.
     # If an entity is offline (return False), the UI will refelect this.
     @property
     def available(self) -> bool:
         """Return True if roller and hub is available."""
-        return self._api.online
+        return self._api.online and self._api.has_total
 
 
 class RaisedSensor(FastBusSensor):
@@ -195,10 +337,53 @@ class RaisedSensor(FastBusSensor):
     #    _attr_suggested_unit_of_measurement = "USD"
     _attr_state_class = SensorStateClass.TOTAL
 
+    def __init__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._last_write = float("-inf")
+        self._write_timer: asyncio.TimerHandle | None = None
+
+    async def async_added_to_hass(self) -> None:
+        if not self._api.statistics_mode:
+            await super().async_added_to_hass()
+            return
+        # History comes from the hourly statistics, the state only needs to
+        # keep up loosely
+        self._api.register_callback(self._async_write_throttled)
+
+    async def async_will_remove_from_hass(self) -> None:
+        if not self._api.statistics_mode:
+            await super().async_will_remove_from_hass()
+            return
+        self._api.remove_callback(self._async_write_throttled)
+        if self._write_timer is not None:
+            self._write_timer.cancel()
+            self._write_timer = None
+
+    @callback
+    def _async_write_throttled(self) -> None:
+        if self._write_timer is not None:
+            # The latest total goes out when the timer fires
+            return
+        wait = (
+            self._last_write
+            + STATISTICS_STATE_INTERVAL.total_seconds()
+            - self.hass.loop.time()
+        )
+        if wait > 0:
+            self._write_timer = self.hass.loop.call_later(wait, self._async_write)
+        else:
+            self._async_write()
+
+    @callback
+    def _async_write(self) -> None:
+        self._write_timer = None
+        self._last_write = self.hass.loop.time()
+        self.async_write_ha_state()
+
     @property
     def native_value(self) -> StateType:
         """Return the value reported by the sensor."""
-        return self._api.total_raised
+        return self._api.snapshot.total_raised
 
 
 class HoursSensor(FastBusSensor):
@@ -212,8 +397,7 @@ class HoursSensor(FastBusSensor):
     @property
     def native_value(self) -> StateType:
         """Return the value reported by the sensor."""
-        total = self._api.total_raised
-        return BusMath.dollars_to_hours(total)
+        return self._api.snapshot.hours_purchased
 
 
 class HoursCostSensor(FastBusSensor):
@@ -227,16 +411,265 @@ class HoursCostSensor(FastBusSensor):
     @property
     def native_value(self) -> StateType:
         """Return the value reported by the sensor."""
-        total = self._api.total_raised
-        run_purchased = BusMath.dollars_to_hours(total)
-        cost_of_purchased = BusMath.hours_to_dollars(run_purchased)
-        next_hour_price_total = BusMath.price_for_hour(run_purchased)
-        next_hour_price_remaining = next_hour_price_total - (total - cost_of_purchased)
-        return next_hour_price_remaining
+        return self._api.snapshot.next_hour_price_remaining
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        return {"Total": self._api.snapshot.next_hour_price_total}
+
+
+class DonationRateSensor(FastBusSensor):
+    _window: int
+    _attr_native_unit_of_measurement = "USD/min"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        # Samples age out of the window whether or not messages arrive
+        refresh = datetime.timedelta(minutes=self._window) / RATE_REFRESHES_PER_WINDOW
+        self.async_on_remove(
+            async_track_time_interval(
+                self.hass,
+                self._async_refresh,
+                self._api.clock.to_real_delta(refresh),
+            )
+        )
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the value reported by the sensor."""
+        return self._api.donation_rate(self._window)
+
+
+class DonationRate1mSensor(DonationRateSensor):
+    _key = "donation_rate_1m"
+    _attr_name = "Deset Bus Donation Rate (1 minute)"
+    _window = 1
+
+
+class DonationRate5mSensor(DonationRateSensor):
+    _key = "donation_rate_5m"
+    _attr_name = "Deset Bus Donation Rate (5 minutes)"
+    _window = 5
+
+
+class DonationRate60mSensor(DonationRateSensor):
+    _key = "donation_rate_60m"
+    _attr_name = "Deset Bus Donation Rate (60 minutes)"
+    _window = 60
+
+
+class CoordinatedBusSensor(FastBusSensor):
+    """Live sensor that also depends on coordinator data."""
+
+    def __init__(
+        self,
+        bus_api: BusNub,
+        coordinator: DesertBusUpdateCoordinator,
+        *args: typing.Any,
+        **kwargs: typing.Any,
+    ) -> None:
+        super().__init__(bus_api, *args, **kwargs)
+        self._coordinator = coordinator
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._coordinator.async_add_listener(self._async_write_if_changed)
+        )
+
+
+class PastFinalsSensor(CoordinatedBusSensor):
+    """Difference between the live run and the final result of the run before it.
+
+    Past runs only publish their final summary, not where they stood hour by
+    hour, so this is how far the live run is from each earlier run's end
+    result rather than a comparison of pace.
+    """
+
+    # Field of the past run summaries, and of BusSnapshot, being compared
+    _field: str
+    _snapshot_field: str
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    # Move with every total, min_delta already covers them through the value
+    _derived_attributes = frozenset(
+        {"percent_of_previous_final", "percent_of_record_final"}
+    )
+
+    def _current(self) -> float | None:
+        if not self._api.has_total:
+            return None
+        return getattr(self._api.snapshot, self._snapshot_field)
+
+    def _previous(self) -> tuple[int, float] | None:
+        if self._coordinator.data is None:
+            return None
+        year = self._coordinator.data.db_year - 1
+        summary = self._coordinator.past_runs.get(year)
+        if summary is None:
+            return None
+        return year, summary[self._field]
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the value reported by the sensor."""
+        if (previous := self._previous()) is None or (
+            current := self._current()
+        ) is None:
+            return None
+        return round(current - previous[1], 2)
 
     @property
     def extra_state_attributes(self) -> dict:
-        total = self._api.total_raised
-        run_purchased = BusMath.dollars_to_hours(total)
-        next_hour_price_total = BusMath.price_for_hour(run_purchased)
-        return {"Total": next_hour_price_total}
+        attributes: dict[str, typing.Any] = {}
+        if (current := self._current()) is None:
+            return attributes
+        if (previous := self._previous()) is not None:
+            year, value = previous
+            attributes["previous_year"] = year
+            attributes["previous_final"] = value
+            if value:
+                attributes["percent_of_previous_final"] = round(
+                    current / value * 100, 1
+                )
+        if runs := self._coordinator.past_runs:
+            year = max(runs, key=lambda run: runs[run][self._field])
+            value = runs[year][self._field]
+            attributes["record_year"] = year
+            attributes["record_final"] = value
+            if value:
+                attributes["percent_of_record_final"] = round(current / value * 100, 1)
+        return attributes
+
+
+class RaisedVsPreviousFinalSensor(PastFinalsSensor):
+    _key = "total_raised_vs_previous_final"
+    _attr_name = "Deset Bus Total Raised vs Previous Final Total"
+    _attr_device_class = SensorDeviceClass.MONETARY
+    _attr_native_unit_of_measurement = "USD"
+    _attr_state_class = None
+    _field = "total_raised"
+    _snapshot_field = "total_raised"
+
+
+class HoursVsPreviousFinalSensor(PastFinalsSensor):
+    _key = "run_purchased_vs_previous_final"
+    _attr_name = "Deset Bus Time Paid For vs Previous Final Time"
+    _attr_native_unit_of_measurement = ha_const.UnitOfTime.HOURS
+    _field = "run_purchased"
+    _snapshot_field = "hours_purchased"
+
+
+class ChannelRaisedSensor(FastBusSensor):
+    """Total on one of the extra channels multiplexed over BusNub."""
+
+    _attr_device_class = SensorDeviceClass.MONETARY
+    _attr_native_unit_of_measurement = "USD"
+    _attr_state_class = SensorStateClass.TOTAL
+
+    def __init__(
+        self,
+        bus_api: BusNub,
+        channel: BusChannel,
+        *args: typing.Any,
+        **kwargs: typing.Any,
+    ) -> None:
+        self._channel = channel
+        self._attr_name = f"Deset Bus {channel.name} Total Raised"
+        super().__init__(bus_api, *args, **kwargs)
+
+    @property
+    def _key(self) -> str:
+        return f"total_raised_{slugify(self._channel.name)}"
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the value reported by the sensor."""
+        return self._channel.total
+
+    @property
+    def available(self) -> bool:
+        # Independent of whether the main channel has a total yet
+        return self._api.online and self._channel.total is not None
+
+
+class ProjectionSensor(CoordinatedBusSensor):
+    """Where the run ends up at the current smoothed donation rate."""
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        # The smoothed rate decays whether or not messages arrive
+        self.async_on_remove(
+            async_track_time_interval(
+                self.hass,
+                self._async_refresh,
+                self._api.clock.to_real_delta(PROJECTION_REFRESH),
+            )
+        )
+
+    @property
+    def _projection(self) -> BusProjection | None:
+        if self._coordinator.data is None:
+            return None
+        return self._api.projection(self._coordinator.data.start_time)
+
+    @property
+    def available(self) -> bool:
+        return super().available and self._projection is not None
+
+
+class ProjectedRaisedSensor(ProjectionSensor):
+    _key = "projected_total_raised"
+    _attr_name = "Deset Bus Projected Total Raised"
+    _attr_device_class = SensorDeviceClass.MONETARY
+    _attr_native_unit_of_measurement = "USD"
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the value reported by the sensor."""
+        projection = self._projection
+        return projection.final_total if projection is not None else None
+
+
+class ProjectedHoursSensor(ProjectionSensor):
+    _key = "projected_run_purchased"
+    _attr_name = "Deset Bus Projected Time Paid For"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = ha_const.UnitOfTime.HOURS
+    _attr_suggested_unit_of_measurement = ha_const.UnitOfTime.HOURS
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the value reported by the sensor."""
+        projection = self._projection
+        return projection.final_hours if projection is not None else None
+
+
+class ProjectedEndSensor(ProjectionSensor):
+    _key = "projected_end_time"
+    _attr_name = "Deset Bus Projected End Time"
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+
+    @property
+    def native_value(self) -> datetime.datetime | None:
+        """Return the value reported by the sensor."""
+        projection = self._projection
+        if projection is None:
+            return None
+        return hass_dt.utc_from_timestamp(projection.end_time)
+
+
+class NextHourSensor(ProjectionSensor):
+    _key = "time_to_next_hour"
+    _attr_name = "Deset Bus Time to Next Hour"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = ha_const.UnitOfTime.MINUTES
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the value reported by the sensor."""
+        projection = self._projection
+        if projection is None or projection.next_hour_time is None:
+            return None
+        now = self._coordinator.clock.now().timestamp()
+        return round(max(projection.next_hour_time - now, 0.0) / 60, 1)
@@ -0,0 +1,76 @@
+"""Warm-start snapshot kept across Home Assistant restarts."""
+
+from __future__ import annotations
+
+import logging
+import typing
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = DOMAIN
+# Seconds to batch changes before they are written to disk
+STORAGE_SAVE_DELAY = 30
+
+
+class _SnapshotStore(Store[dict[str, typing.Any]]):
+    """A Store that drops snapshots saved in any other format."""
+
+    async def _async_migrate_func(
+        self,
+        old_major_version: int,
+        old_minor_version: int,
+        old_data: dict[str, typing.Any],
+    ) -> dict[str, typing.Any]:
+        # Only a warm start is lost, everything in it is fetched again
+        _LOGGER.info(
+            "Discarding snapshot saved as version %s.%s",
+            old_major_version,
+            old_minor_version,
+        )
+        return {}
+
+
+class DesertBusStore:
+    """Coordinator data, check timestamps and the last live total."""
+
+    def __init__(self, hass: HomeAssistant, key: str | None = STORAGE_KEY) -> None:
+        # Without a key nothing is read or written, the data lasts until unload
+        self._store = (
+            None if key is None else _SnapshotStore(hass, STORAGE_VERSION, key)
+        )
+        self._data: dict[str, typing.Any] = {}
+        self._save_pending = False
+
+    @property
+    def data(self) -> dict[str, typing.Any]:
+        return self._data
+
+    async def async_load(self) -> dict[str, typing.Any]:
+        if self._store is None:
+            return self._data
+        data = await self._store.async_load()
+        self._data = data if isinstance(data, dict) else {}
+        return self._data
+
+    @callback
+    def async_update(self, **fields: typing.Any) -> None:
+        self._data.update(fields)
+        if self._store is None:
+            return
+        if self._save_pending:
+            # Picked up by the write already scheduled. Scheduling again would
+            # push it back, under steady traffic it would never happen.
+            return
+        self._save_pending = True
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, typing.Any]:
+        self._save_pending = False
+        return self._data
@@ -0,0 +1,71 @@
+"""Fixtures for benchmarking code that runs on Home Assistant's event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import collections.abc
+import typing
+
+import pytest
+
+
+class AsyncBenchmark:
+    """Time coroutines on the running event loop with pytest-benchmark.
+
+    pytest-benchmark only times plain functions, so it runs in an executor
+    thread and waits on each call it makes to the loop. The loop keeps
+    running as it does in Home Assistant, and every round includes handing
+    the call to the loop and back.
+    """
+
+    def __init__(self, benchmark, loop: asyncio.AbstractEventLoop) -> None:
+        self._benchmark = benchmark
+        self._loop = loop
+
+    @property
+    def extra_info(self) -> dict[str, typing.Any]:
+        return self._benchmark.extra_info
+
+    @property
+    def mean(self) -> float | None:
+        """Mean seconds per round, None when benchmarks are disabled."""
+        if self._benchmark.stats is None:
+            return None
+        return self._benchmark.stats.stats.mean
+
+    def _on_loop(
+        self, func: collections.abc.Callable[..., collections.abc.Awaitable]
+    ) -> collections.abc.Callable[..., typing.Any]:
+        def call(*args: typing.Any) -> typing.Any:
+            return asyncio.run_coroutine_threadsafe(func(*args), self._loop).result()
+
+        return call
+
+    async def __call__(
+        self,
+        func: collections.abc.Callable[..., collections.abc.Awaitable],
+        *args: typing.Any,
+    ) -> typing.Any:
+        return await self._loop.run_in_executor(
+            None, self._benchmark, self._on_loop(func), *args
+        )
+
+    async def pedantic(
+        self,
+        func: collections.abc.Callable[..., collections.abc.Awaitable],
+        setup: collections.abc.Callable[[], collections.abc.Awaitable] | None = None,
+        rounds: int = 1,
+    ) -> typing.Any:
+        on_loop_setup = self._on_loop(setup) if setup is not None else None
+        return await self._loop.run_in_executor(
+            None,
+            lambda: self._benchmark.pedantic(
+                self._on_loop(func), setup=on_loop_setup, rounds=rounds
+            ),
+        )
+
+
+@pytest.fixture
+async def async_benchmark(benchmark) -> AsyncBenchmark:
+    """Benchmark coroutine functions on the test's event loop."""
+    return AsyncBenchmark(benchmark, asyncio.get_running_loop())
@@ -0,0 +1,93 @@
+"""BusMath and BusSnapshot throughput."""
+
+from __future__ import annotations
+
+import math
+import random
+
+import pytest
+
+from desertbus.util import BusMath, BusSnapshot
+
+pytest.importorskip("pytest_benchmark")
+
+# Spread over a whole run, from nothing to well past any record so far
+TOTALS = [round(random.Random(2007).uniform(0, 2_000_000), 2) for _ in range(10_000)]
+
+
+def _dollars_to_hours_closed_form(dollars: float, rate: float = 1.07) -> int:
+    """The float log math the cost table replaced."""
+    return math.floor(math.log(dollars * (rate - 1) + 1) / math.log(rate))
+
+
+def _hours_to_dollars_closed_form(hours: int, rate: float = 1.07) -> float:
+    return round((1 - rate**hours) / (1 - rate), 2)
+
+
+def _price_for_hour_closed_form(hour: int, rate: float = 1.07) -> float:
+    return round(rate**hour, 2)
+
+
+def _conversions_per_second(benchmark, count: int) -> None:
+    # Nothing is timed under --benchmark-disable
+    if benchmark.stats is not None:
+        benchmark.extra_info["conversions_per_second"] = (
+            count / benchmark.stats.stats.mean
+        )
+
+
+def test_dollars_to_hours(benchmark) -> None:
+    def convert() -> None:
+        for total in TOTALS:
+            BusMath.dollars_to_hours(total)
+
+    benchmark(convert)
+    _conversions_per_second(benchmark, len(TOTALS))
+
+
+def test_dollars_to_hours_closed_form(benchmark) -> None:
+    """The replaced math, for comparison."""
+
+    def convert() -> None:
+        for total in TOTALS:
+            _dollars_to_hours_closed_form(total)
+
+    benchmark(convert)
+    _conversions_per_second(benchmark, len(TOTALS))
+
+
+def test_dollars_to_hours_batch(benchmark) -> None:
+    hours = benchmark(BusMath.dollars_to_hours_batch, TOTALS)
+    assert hours == [BusMath.dollars_to_hours(total) for total in TOTALS]
+    _conversions_per_second(benchmark, len(TOTALS))
+
+
+def test_hours_to_dollars(benchmark) -> None:
+    def convert() -> None:
+        for hour in range(200):
+            BusMath.hours_to_dollars(hour)
+            BusMath.price_for_hour(hour)
+
+    benchmark(convert)
+    _conversions_per_second(benchmark, 400)
+
+
+def test_hours_to_dollars_closed_form(benchmark) -> None:
+    """The replaced math, for comparison."""
+
+    def convert() -> None:
+        for hour in range(200):
+            _hours_to_dollars_closed_form(hour)
+            _price_for_hour_closed_form(hour)
+
+    benchmark(convert)
+    _conversions_per_second(benchmark, 400)
+
+
+def test_snapshot_from_total(benchmark) -> None:
+    def snapshot() -> None:
+        for total in TOTALS:
+            BusSnapshot.from_total(total)
+
+    benchmark(snapshot)
+    _conversions_per_second(benchmark, len(TOTALS))
@@ -0,0 +1,76 @@
+"""Coordinator tick latency against a local stand-in for vst.ninja."""
+
+from __future__ import annotations
+
+import datetime
+import logging
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+from pytest_homeassistant_custom_component.common import \
+    MockConfigEntry  # noqa: E402
+
+from desertbus.const import (BUS_TIMEZONE, DOMAIN,  # noqa: E402
+                             MIN_UPDATE_INTERVAL)
+from desertbus.coordinator import DesertBusUpdateCoordinator  # noqa: E402
+from desertbus.metrics import Metrics  # noqa: E402
+from desertbus.storage import DesertBusStore  # noqa: E402
+
+
+@pytest.fixture
+async def coordinator(hass: HomeAssistant, vst_ninja):
+    entry = MockConfigEntry(domain=DOMAIN)
+    entry.add_to_hass(hass)
+    coordinator = DesertBusUpdateCoordinator(
+        hass,
+        logging.getLogger(__name__),
+        config_entry=entry,
+        name=DOMAIN,
+        update_interval=MIN_UPDATE_INTERVAL,
+        always_update=False,
+        store=DesertBusStore(hass, f"{DOMAIN}_bench"),
+        metrics=Metrics(),
+    )
+    # The first tick also loads every past run, get that out of the way
+    await coordinator.async_refresh()
+    await hass.async_block_till_done(wait_background_tasks=True)
+    yield coordinator
+    await coordinator.async_shutdown()
+
+
+async def test_tick_reusing_stats(async_benchmark, coordinator, vst_ninja) -> None:
+    """A tick inside the phase's stats interval, no request is made."""
+    requests = sum(vst_ninja.requests.values())
+
+    await async_benchmark(coordinator.async_refresh)
+    assert coordinator.last_update_success
+    assert sum(vst_ninja.requests.values()) == requests
+
+
+async def test_tick_revalidating_stats(
+    async_benchmark, coordinator, vst_ninja
+) -> None:
+    """A tick that revalidates the stats and gets a 304 back."""
+    hits = coordinator.http_stats["hits"]
+
+    async def expire_stats() -> None:
+        coordinator._last_stats_attempt = datetime.datetime.min.replace(
+            tzinfo=BUS_TIMEZONE
+        )
+
+    await async_benchmark.pedantic(
+        coordinator.async_refresh, setup=expire_stats, rounds=50
+    )
+    assert coordinator.last_update_success
+    assert coordinator.data.total_raised == 1158314.33
+    # Every round revalidated, there's only the one when benchmarks are disabled
+    assert coordinator.http_stats["hits"] > hits
+
+
+async def test_parse_stats(async_benchmark, db_stats: bytes) -> None:
+    stats = await async_benchmark(DesertBusUpdateCoordinator._parse_stats, db_stats)
+    assert stats["Max Hour Purchased"] == 167
@@ -0,0 +1,107 @@
+"""Messages per second from a PubNub message through to entity state writes."""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+from pubnub.models.consumer.pubsub import PNMessageResult  # noqa: E402
+from pytest_homeassistant_custom_component.common import \
+    MockEntityPlatform  # noqa: E402
+
+from desertbus.const import DOMAIN  # noqa: E402
+from desertbus.history import DonationHistory  # noqa: E402
+from desertbus.metrics import Metrics  # noqa: E402
+from desertbus.pubnub_desertbus import (BusNub,  # noqa: E402
+                                        BusNubSubscribeCallback)
+from desertbus.replay import WallClock  # noqa: E402
+from desertbus.sensor import (DonationRate1mSensor,  # noqa: E402
+                              DonationRate5mSensor, DonationRate60mSensor,
+                              HoursCostSensor, HoursSensor, RaisedSensor)
+from desertbus.storage import DesertBusStore  # noqa: E402
+
+CHANNEL = "desertbus-bench"
+# Messages per benchmark round
+BURST = 1000
+
+
+class FakePublisher:
+    """Deliver totals to BusNub's listener the way the PubNub SDK does."""
+
+    def __init__(self, bus: BusNub, total: float) -> None:
+        self._listener = BusNubSubscribeCallback(bus)
+        self._timetoken = int(time.time() * 10_000_000)
+        self.total = total
+
+    def publish(self, amount: float) -> None:
+        self.total = round(self.total + amount, 2)
+        self._timetoken += 1
+        self._listener.message(
+            None,
+            PNMessageResult(
+                message=self.total,
+                subscription=None,
+                channel=CHANNEL,
+                timetoken=self._timetoken,
+            ),
+        )
+
+
+@pytest.fixture
+async def bus(hass: HomeAssistant, tmp_path):
+    store = DesertBusStore(hass, f"{DOMAIN}_bench")
+    # A saved total brings BusNub up online, as after a restart
+    store.data.update(total_raised=1_000_000.0, total_timestamp=time.time())
+    bus = BusNub(
+        hass,
+        subscribe_key="sub-c-bench",
+        channel=CHANNEL,
+        # Every message is flushed to the entities straight away
+        update_interval=0,
+        store=store,
+        history=DonationHistory(str(tmp_path / "timeline")),
+        metrics=Metrics(),
+        clock=WallClock(),
+    )
+    yield bus
+    await bus.async_close_api()
+
+
+@pytest.fixture
+async def sensors(hass: HomeAssistant, bus: BusNub):
+    entities = [
+        RaisedSensor(bus),
+        HoursSensor(bus),
+        HoursCostSensor(bus),
+        DonationRate1mSensor(bus),
+        DonationRate5mSensor(bus),
+        DonationRate60mSensor(bus),
+    ]
+    platform = MockEntityPlatform(hass, domain="sensor", platform_name=DOMAIN)
+    await platform.async_add_entities(entities)
+    yield entities
+    for entity in entities:
+        await entity.async_remove()
+
+
+async def test_message_fanout(
+    async_benchmark, hass: HomeAssistant, bus: BusNub, sensors: list
+) -> None:
+    publisher = FakePublisher(bus, bus.total_raised)
+
+    async def publish_burst() -> None:
+        for _ in range(BURST):
+            publisher.publish(5.0)
+
+    await async_benchmark(publish_burst)
+    if (mean := async_benchmark.mean) is not None:
+        async_benchmark.extra_info["messages_per_second"] = BURST / mean
+    async_benchmark.extra_info["state_writes"] = bus.state_writes
+    assert hass.states.get("sensor.desertbus_total_raised").state == str(
+        publisher.total
+    )
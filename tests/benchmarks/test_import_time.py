@@ -0,0 +1,74 @@
+"""Import time of the integration, and what it pulls in at load."""
+
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("homeassistant")
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent.parent
+PACKAGE = "custom_components.desertbus"
+# Only needed once the integration is running, never at load
+DEFERRED = ("pubnub", "lxml", "dateutil")
+
+# Home Assistant has these loaded before it sets up any integration, so they
+# are imported first and left out of what the integration is charged for
+_MEASURE = """
+import json, sys
+import homeassistant.components.sensor
+import homeassistant.config_entries
+import homeassistant.helpers.update_coordinator
+loaded = set(sys.modules)
+import {package}, {package}.sensor, {package}.config_flow
+print(json.dumps(sorted(set(sys.modules) - loaded)))
+"""
+
+
+def _own_import_time(profile: str) -> int:
+    """Cumulative microseconds of the top level imports under PACKAGE."""
+    total = 0
+    for line in profile.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # Nested imports are indented under whatever imported them
+        if name.startswith("  ") or not name.strip().startswith(PACKAGE):
+            continue
+        total += int(cumulative)
+    return total
+
+
+def _profile_import(tmp_path: pathlib.Path) -> tuple[int, list[str]]:
+    custom_components = tmp_path / "custom_components"
+    if not custom_components.exists():
+        custom_components.mkdir()
+        (custom_components / "desertbus").symlink_to(ROOT, target_is_directory=True)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _MEASURE.format(package=PACKAGE)],
+        capture_output=True,
+        check=True,
+        cwd=tmp_path,
+        env={**os.environ, "PYTHONPATH": str(tmp_path)},
+        text=True,
+    )
+    return _own_import_time(result.stderr), json.loads(result.stdout)
+
+
+def test_import_time(benchmark, tmp_path: pathlib.Path) -> None:
+    """Each round is a fresh interpreter, so the timing includes starting it.
+
+    The integration's own share is in extra_info.
+    """
+    import_time, modules = benchmark.pedantic(
+        _profile_import, args=(tmp_path,), rounds=3, iterations=1
+    )
+    benchmark.extra_info["import_time_us"] = import_time
+    benchmark.extra_info["modules_loaded"] = len(modules)
+    assert [module for module in modules if module.split(".")[0] in DEFERRED] == []
@@ -0,0 +1,98 @@
+"""Parse time and peak memory of the desertbus.org page scrape."""
+
+from __future__ import annotations
+
+import io
+import pathlib
+import subprocess
+import sys
+
+import dateutil.parser
+import lxml.html
+import pytest
+
+from desertbus.scrape import parse_db_page
+
+pytest.importorskip("pytest_benchmark")
+
+EXPECTED = {"start-time": "2025-11-14T10:00:00", "total-raised": "1158314.33"}
+
+
+def _parse_db_page_dom(page: bytes) -> dict:
+    """The full lxml DOM + cssselect scrape parse_db_page replaced."""
+    root = lxml.html.parse(io.BytesIO(page)).getroot()
+    for element in root.cssselect("div .text-xs.text-brand-gold"):
+        element_text = element.text
+        loc = element_text.find("Begins ")
+        if loc != -1:
+            start_time = dateutil.parser.parse(
+                element_text[loc + len("Begins ") :], ignoretz=True
+            )
+        if element_text.find(" Total Raised") != -1:
+            raised_text = element.getnext().text
+            total_raised = raised_text[raised_text.find("$") + 1 :]
+    return {
+        "start-time": start_time.isoformat(),
+        "total-raised": total_raised.replace(",", ""),
+    }
+
+
+# Run in a fresh interpreter with its high-water mark reset (Linux only), so
+# nothing imported or parsed earlier has raised the peak
+_MEASURE = """
+import pathlib, sys
+sys.path[:0] = [{tests!r}, {benchmarks!r}]
+import conftest, test_parsing
+
+def status(field):
+    with open("/proc/self/status") as lines:
+        for line in lines:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) * 1024
+
+page = pathlib.Path({page!r}).read_bytes()
+with open("/proc/self/clear_refs", "w") as clear_refs:
+    clear_refs.write("5")
+before = status("VmRSS")
+getattr(test_parsing, {parse!r})(page)
+print(status("VmHWM") - before)
+"""
+
+
+def _peak_memory(parse: str) -> int | None:
+    """Bytes the peak resident set grows by while parsing the page fixture.
+
+    lxml builds its tree outside the Python allocator, where tracemalloc
+    can't see it. None where there's no /proc to read it from.
+    """
+    if not pathlib.Path("/proc/self/clear_refs").exists():
+        return None
+    benchmarks = pathlib.Path(__file__).resolve().parent
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            _MEASURE.format(
+                tests=str(benchmarks.parent),
+                benchmarks=str(benchmarks),
+                page=str(benchmarks.parent / "fixtures" / "db_page.html"),
+                parse=parse,
+            ),
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return int(result.stdout)
+
+
+def test_parse_db_page(benchmark, db_page: bytes) -> None:
+    assert benchmark(parse_db_page, db_page) == EXPECTED
+    benchmark.extra_info["peak_memory"] = _peak_memory("parse_db_page")
+
+
+def test_parse_db_page_dom(benchmark, db_page: bytes) -> None:
+    """The replaced parser, for comparison."""
+    pytest.importorskip("cssselect")
+    assert benchmark(_parse_db_page_dom, db_page) == EXPECTED
+    benchmark.extra_info["peak_memory"] = _peak_memory("_parse_db_page_dom")
@@ -0,0 +1,343 @@
+"""Shared fixtures for the Desert Bus tests.
+
+The repository root is the integration package itself, installed as
+``custom_components/desertbus``. It is registered here as ``desertbus``
+without running its ``__init__``, so the modules that don't need Home
+Assistant are testable without it installed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import importlib.machinery
+import importlib.util
+import logging
+import pathlib
+import sys
+import time
+import types
+import typing
+
+import pytest
+from aiohttp import hdrs, web
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+FIXTURES = pathlib.Path(__file__).resolve().parent / "fixtures"
+
+
+def _register_package() -> None:
+    if "desertbus" in sys.modules:
+        return
+    spec = importlib.machinery.ModuleSpec("desertbus", None, is_package=True)
+    spec.submodule_search_locations = [str(ROOT)]
+    package = types.ModuleType("desertbus")
+    package.__spec__ = spec
+    package.__path__ = spec.submodule_search_locations
+    sys.modules["desertbus"] = package
+
+
+_register_package()
+
+
+@pytest.fixture(scope="session")
+def db_page() -> bytes:
+    """A saved desertbus.org run page."""
+    return (FIXTURES / "db_page.html").read_bytes()
+
+
+@pytest.fixture(scope="session")
+def db_stats() -> bytes:
+    """A saved vst.ninja stats JSON."""
+    return (FIXTURES / "db_stats.json").read_bytes()
+
+
+class StandInServer:
+    """Serve saved fixtures in place of vst.ninja and desertbus.org.
+
+    Stats are served with an ETag and answered with a 304 when it matches, as
+    vst.ninja does. Years in missing have no stats, or no desertbus.org page
+    for calendar years. Every request is counted by path.
+    """
+
+    STATS_ETAG = '"db-stats"'
+
+    def __init__(self, stats: bytes, page: bytes) -> None:
+        self.stats = stats
+        self.page = page
+        self.omega = b"0"
+        self.missing: set[int] = set()
+        self.requests: collections.Counter[str] = collections.Counter()
+        self.app = web.Application()
+        self.app.router.add_get("/DB{year}/data/{name}", self._handle_stats)
+        self.app.router.add_get("/Resources/isitomegashift.html", self._handle_omega)
+        self.app.router.add_get("/{year}/", self._handle_page)
+
+    async def _handle_stats(self, request: web.Request) -> web.Response:
+        self.requests[request.path] += 1
+        if int(request.match_info["year"]) in self.missing:
+            raise web.HTTPNotFound
+        if request.headers.get(hdrs.IF_NONE_MATCH) == self.STATS_ETAG:
+            return web.Response(status=304)
+        return web.Response(
+            body=self.stats,
+            content_type="application/json",
+            headers={hdrs.ETAG: self.STATS_ETAG},
+        )
+
+    async def _handle_omega(self, request: web.Request) -> web.Response:
+        self.requests[request.path] += 1
+        return web.Response(body=self.omega, content_type="text/html")
+
+    async def _handle_page(self, request: web.Request) -> web.Response:
+        self.requests[request.path] += 1
+        if int(request.match_info["year"]) in self.missing:
+            raise web.HTTPNotFound
+        return web.Response(body=self.page, content_type="text/html")
+
+
+@pytest.fixture
+async def vst_ninja(
+    db_stats: bytes, db_page: bytes, monkeypatch: pytest.MonkeyPatch, socket_enabled
+):
+    """Point the coordinator at a local stand-in for vst.ninja and desertbus.org.
+
+    Home Assistant's test plugin blocks sockets, the stand-in needs one to
+    listen on.
+    """
+    from aiohttp.test_utils import TestServer
+
+    from desertbus import coordinator
+
+    stand_in = StandInServer(db_stats, db_page)
+    server = TestServer(stand_in.app)
+    await server.start_server()
+    base = f"http://{server.host}:{server.port}"
+    monkeypatch.setattr(
+        coordinator,
+        "STATS_URL_TEMPLATE",
+        f"{base}/DB{{year}}/data/DB{{year}}_stats.json",
+    )
+    monkeypatch.setattr(coordinator, "SCRAPE_URL_TEMPLATE", f"{base}/{{year}}/")
+    monkeypatch.setattr(
+        coordinator, "OMEGA_CHECK_URL", f"{base}/Resources/isitomegashift.html"
+    )
+    yield stand_in
+    await server.close()
+
+
+@pytest.fixture
+async def coordinator(hass, vst_ninja):
+    """A coordinator fetching from the vst.ninja stand-in, not refreshed yet."""
+    from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+    from desertbus.const import DOMAIN, MIN_UPDATE_INTERVAL
+    from desertbus.coordinator import DesertBusUpdateCoordinator
+    from desertbus.metrics import Metrics
+    from desertbus.storage import DesertBusStore
+
+    entry = MockConfigEntry(domain=DOMAIN)
+    entry.add_to_hass(hass)
+    coordinator = DesertBusUpdateCoordinator(
+        hass,
+        logging.getLogger(__name__),
+        config_entry=entry,
+        name=DOMAIN,
+        update_interval=MIN_UPDATE_INTERVAL,
+        always_update=False,
+        store=DesertBusStore(hass, f"{DOMAIN}_test"),
+        metrics=Metrics(),
+    )
+    yield coordinator
+    await coordinator.async_shutdown()
+
+
+def _load_integration() -> types.ModuleType:
+    """Run the package __init__ left out above, as a module of its own.
+
+    Its relative imports resolve to the modules the other tests use.
+    """
+    spec = importlib.util.spec_from_file_location(
+        "desertbus", ROOT / "__init__.py", submodule_search_locations=[str(ROOT)]
+    )
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+async def setup_entry(hass, monkeypatch: pytest.MonkeyPatch):
+    """Set up config entries through async_setup_entry, returns the coordinator.
+
+    Platforms aren't forwarded to, the integration isn't loaded the way Home
+    Assistant loads it. Keyword arguments go to the MockConfigEntry.
+    """
+    from unittest.mock import AsyncMock
+
+    from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+    from desertbus.const import DOMAIN
+
+    integration = _load_integration()
+    monkeypatch.setattr(
+        hass.config_entries, "async_forward_entry_setups", AsyncMock()
+    )
+    entries = []
+
+    async def setup(**entry_args: typing.Any):
+        entry = MockConfigEntry(domain=DOMAIN, **entry_args)
+        entry.add_to_hass(hass)
+        entries.append(entry)
+        assert await integration.async_setup_entry(hass, entry)
+        await hass.async_block_till_done(wait_background_tasks=True)
+        return hass.data[DOMAIN][entry.entry_id]["coordinator"]
+
+    yield setup
+    for entry in entries:
+        entry_data = hass.data[DOMAIN][entry.entry_id]
+        if "api" in entry_data:
+            await entry_data["api"].async_close_api()
+        await entry_data["coordinator"].async_shutdown()
+
+
+class PubNubStandIn:
+    """Serve PubNub's subscribe and history endpoints from memory.
+
+    Messages are published with publish(). While down is set every subscribe
+    request fails, the way a dropped connection does. Messages published with
+    live=False are only kept in history, the way PubNub drops them once too
+    many were missed to catch up on. The next history_failures history
+    requests fail. Every request is counted by endpoint.
+    """
+
+    # How long a subscribe request waits for a message, PubNub uses minutes
+    LONG_POLL = 1.0
+
+    def __init__(self) -> None:
+        self.messages: dict[str, list[tuple[int, typing.Any]]] = {}
+        self.history_only: set[int] = set()
+        self.history_failures = 0
+        self.timetoken = int(time.time() * 10_000_000)
+        self.requests: collections.Counter[str] = collections.Counter()
+        # host:port, set once the server is listening
+        self.origin = ""
+        self._down = False
+        self._published = asyncio.Event()
+        self.app = web.Application()
+        self.app.router.add_get(
+            "/v2/subscribe/{key}/{channels}/0", self._handle_subscribe
+        )
+        self.app.router.add_get(
+            "/v3/history/sub-key/{key}/channel/{channels}", self._handle_history
+        )
+
+    @property
+    def down(self) -> bool:
+        return self._down
+
+    @down.setter
+    def down(self, down: bool) -> None:
+        self._down = down
+        # Fail the subscribe requests already waiting
+        self._wake()
+
+    def publish(self, channel: str, message: typing.Any, live: bool = True) -> int:
+        self.timetoken += 10_000
+        self.messages.setdefault(channel, []).append((self.timetoken, message))
+        if not live:
+            self.history_only.add(self.timetoken)
+        self._wake()
+        return self.timetoken
+
+    def _wake(self) -> None:
+        self._published.set()
+        self._published = asyncio.Event()
+
+    def _since(self, channels: list[str], timetoken: int) -> list[tuple]:
+        return sorted(
+            (tt, channel, message)
+            for channel in channels
+            for tt, message in self.messages.get(channel, [])
+            if tt > timetoken and tt not in self.history_only
+        )
+
+    async def _handle_subscribe(self, request: web.Request) -> web.Response:
+        self.requests["subscribe"] += 1
+        if self._down:
+            self.requests["subscribe_failed"] += 1
+            raise web.HTTPServiceUnavailable
+        channels = request.match_info["channels"].split(",")
+        timetoken = int(request.query.get("tt", "0"))
+        if not timetoken:
+            # The handshake only hands out the timetoken to listen from
+            return web.json_response({"t": {"t": str(self.timetoken), "r": 1}, "m": []})
+        published = self._published
+        if not self._since(channels, timetoken):
+            try:
+                await asyncio.wait_for(published.wait(), self.LONG_POLL)
+            except TimeoutError:
+                pass
+        if self._down:
+            self.requests["subscribe_failed"] += 1
+            raise web.HTTPServiceUnavailable
+        messages = self._since(channels, timetoken)
+        if messages:
+            timetoken = messages[-1][0]
+        return web.json_response(
+            {
+                "t": {"t": str(timetoken), "r": 1},
+                "m": [
+                    {
+                        "a": "1",
+                        "f": 0,
+                        "p": {"t": str(tt), "r": 1},
+                        "k": request.match_info["key"],
+                        "c": channel,
+                        "d": message,
+                    }
+                    for tt, channel, message in messages
+                ],
+            }
+        )
+
+    async def _handle_history(self, request: web.Request) -> web.Response:
+        """The newest max messages at or after end and before start."""
+        self.requests["history"] += 1
+        if self.history_failures:
+            self.history_failures -= 1
+            return web.json_response(
+                {"status": 503, "error": True, "error_message": "Unavailable"},
+                status=503,
+            )
+        count = int(request.query.get("max", "100"))
+        start = request.query.get("start")
+        end = int(request.query.get("end", "0"))
+        channels = {}
+        for channel in request.match_info["channels"].split(","):
+            items = [
+                (tt, message)
+                for tt, message in self.messages.get(channel, [])
+                if tt >= end and (start is None or tt < int(start))
+            ]
+            channels[channel] = [
+                {"message": message, "timetoken": str(tt)}
+                for tt, message in items[-count:]
+            ]
+        return web.json_response(
+            {"status": 200, "error": False, "error_message": "", "channels": channels}
+        )
+
+
+@pytest.fixture
+async def pubnub_server(socket_enabled):
+    """A local stand-in for PubNub, its address is in the origin attribute."""
+    from aiohttp.test_utils import TestServer
+
+    stand_in = PubNubStandIn()
+    server = TestServer(stand_in.app)
+    await server.start_server()
+    stand_in.origin = f"{server.host}:{server.port}"
+    yield stand_in
+    stand_in.down = True
+    await server.close()
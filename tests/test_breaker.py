@@ -0,0 +1,126 @@
+"""The per-endpoint circuit breaker."""
+
+from __future__ import annotations
+
+import datetime
+
+import pytest
+
+from desertbus.breaker import CircuitBreaker, CircuitOpenError
+
+NOW = datetime.datetime(2025, 11, 14, 10, tzinfo=datetime.timezone.utc)
+BASE_DELAY = datetime.timedelta(seconds=30)
+MAX_DELAY = datetime.timedelta(minutes=30)
+
+
+@pytest.fixture
+def breaker() -> CircuitBreaker:
+    return CircuitBreaker("stats", 3, BASE_DELAY, MAX_DELAY)
+
+
+def _trip(breaker: CircuitBreaker, now: datetime.datetime = NOW) -> None:
+    for _ in range(3):
+        breaker.record_failure(now)
+
+
+def test_opens_at_threshold(breaker: CircuitBreaker) -> None:
+    breaker.record_failure(NOW)
+    breaker.record_failure(NOW)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.check(NOW)
+
+    breaker.record_failure(NOW)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 1
+    with pytest.raises(CircuitOpenError) as err:
+        breaker.check(NOW)
+    assert err.value.endpoint == "stats"
+    assert err.value.retry_at == breaker.retry_at
+
+
+def test_success_resets_failures(breaker: CircuitBreaker) -> None:
+    breaker.record_failure(NOW)
+    breaker.record_failure(NOW)
+    breaker.record_success()
+    breaker.record_failure(NOW)
+    breaker.record_failure(NOW)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.parametrize("jitter", [0.5, 1.0])
+def test_half_open_after_jittered_delay(
+    breaker: CircuitBreaker, monkeypatch: pytest.MonkeyPatch, jitter: float
+) -> None:
+    monkeypatch.setattr("random.uniform", lambda low, high: jitter)
+    _trip(breaker)
+    assert breaker.retry_at == NOW + BASE_DELAY * jitter
+
+    with pytest.raises(CircuitOpenError):
+        breaker.check(breaker.retry_at - datetime.timedelta(microseconds=1))
+    breaker.check(breaker.retry_at)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only the one probe is let through
+    with pytest.raises(CircuitOpenError):
+        breaker.check(breaker.retry_at)
+
+
+def test_retry_delay_within_jitter(breaker: CircuitBreaker) -> None:
+    for _ in range(20):
+        _trip(breaker)
+        assert NOW + BASE_DELAY / 2 <= breaker.retry_at <= NOW + BASE_DELAY
+        breaker.record_success()
+
+
+def test_half_open_success_closes(breaker: CircuitBreaker) -> None:
+    _trip(breaker)
+    breaker.check(breaker.retry_at)
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+    assert breaker.trips == 0
+    assert breaker.retry_at is None
+    breaker.check(NOW)
+
+
+def test_half_open_failure_reopens_for_longer(
+    breaker: CircuitBreaker, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr("random.uniform", lambda low, high: 1.0)
+    _trip(breaker)
+    probe_at = breaker.retry_at
+    breaker.check(probe_at)
+
+    # A failed probe opens the breaker again straight away, for twice as long
+    breaker.record_failure(probe_at)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 2
+    assert breaker.retry_at == probe_at + BASE_DELAY * 2
+
+
+def test_delay_capped(breaker: CircuitBreaker, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("random.uniform", lambda low, high: 1.0)
+    _trip(breaker)
+    for _ in range(30):
+        now = breaker.retry_at
+        breaker.check(now)
+        breaker.record_failure(now)
+    assert breaker.retry_at == now + MAX_DELAY
+
+
+def test_cancelled_probe_reopens(breaker: CircuitBreaker) -> None:
+    _trip(breaker)
+    retry_at = breaker.retry_at
+    breaker.check(retry_at)
+    breaker.record_cancelled()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 1
+    # The next request probes again rather than being refused for good
+    breaker.check(retry_at)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_cancelled_while_closed(breaker: CircuitBreaker) -> None:
+    breaker.record_failure(NOW)
+    breaker.record_cancelled()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 1
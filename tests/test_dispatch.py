@@ -0,0 +1,107 @@
+"""Coalesced update notifications."""
+
+from __future__ import annotations
+
+import datetime
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+from pytest_homeassistant_custom_component.common import (  # noqa: E402
+    async_fire_time_changed)
+
+from desertbus.dispatch import CoalescingDispatcher  # noqa: E402
+from desertbus.metrics import Metrics  # noqa: E402
+
+INTERVAL = datetime.timedelta(seconds=1)
+
+
+@pytest.fixture
+def dispatcher(hass: HomeAssistant) -> CoalescingDispatcher:
+    return CoalescingDispatcher(hass, INTERVAL.total_seconds(), Metrics())
+
+
+async def _elapse(hass: HomeAssistant, freezer) -> None:
+    freezer.tick(INTERVAL)
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+
+
+async def test_burst_coalesced(
+    hass: HomeAssistant, dispatcher: CoalescingDispatcher, freezer
+) -> None:
+    calls: list[int] = []
+    dispatcher.register(lambda: calls.append(dispatcher.messages_received))
+    # Nothing flushed lately, the first goes out straight away
+    dispatcher.async_notify()
+    assert calls == [1]
+
+    for _ in range(10):
+        dispatcher.async_notify()
+    assert calls == [1]
+    await _elapse(hass, freezer)
+    # The rest of the burst in one go
+    assert calls == [1, 11]
+
+    await _elapse(hass, freezer)
+    assert calls == [1, 11]
+
+
+async def test_removed_listener_not_called(
+    hass: HomeAssistant, dispatcher: CoalescingDispatcher
+) -> None:
+    calls: list[str] = []
+
+    def first() -> None:
+        calls.append("first")
+
+    dispatcher.register(first)
+    dispatcher.register(lambda: calls.append("second"))
+    dispatcher.remove(first)
+    dispatcher.async_notify()
+    assert calls == ["second"]
+
+
+async def test_shutdown_drops_pending(
+    hass: HomeAssistant, dispatcher: CoalescingDispatcher, freezer
+) -> None:
+    calls: list[None] = []
+    dispatcher.register(lambda: calls.append(None))
+    dispatcher.async_notify()
+    dispatcher.async_notify()
+    assert len(calls) == 1
+
+    # Unloaded with a flush still due
+    dispatcher.async_shutdown()
+    await _elapse(hass, freezer)
+    assert len(calls) == 1
+
+
+async def test_shutdown_removes_listeners(
+    hass: HomeAssistant, dispatcher: CoalescingDispatcher
+) -> None:
+    calls: list[None] = []
+    dispatcher.register(lambda: calls.append(None))
+    dispatcher.async_shutdown()
+    dispatcher.async_notify()
+    assert calls == []
+
+
+async def test_failing_listener_isolated(
+    hass: HomeAssistant,
+    dispatcher: CoalescingDispatcher,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    calls: list[str] = []
+
+    def broken() -> None:
+        calls.append("broken")
+        raise ValueError("broken listener")
+
+    dispatcher.register(broken)
+    dispatcher.register(lambda: calls.append("working"))
+    dispatcher.async_notify()
+    assert sorted(calls) == ["broken", "working"]
+    assert "broken listener" in caplog.text
@@ -0,0 +1,98 @@
+"""Hourly statistics for the live total."""
+
+from __future__ import annotations
+
+import datetime
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from desertbus import hourly_stats
+from desertbus.const import STATISTICS_LATE_WINDOW
+from desertbus.hourly_stats import DonationStatistics
+
+START = datetime.datetime(2025, 11, 14, 10, 30, tzinfo=datetime.timezone.utc)
+HOUR = datetime.timedelta(hours=1)
+ELEVEN = datetime.datetime(2025, 11, 14, 11, tzinfo=datetime.timezone.utc)
+
+
+def _at(delta: datetime.timedelta) -> float:
+    return (START + delta).timestamp()
+
+
+@pytest.fixture
+def written(monkeypatch: pytest.MonkeyPatch) -> list[list[dict]]:
+    """Every batch of statistics written, in order."""
+    batches: list[list[dict]] = []
+
+    def add_external_statistics(hass, metadata, statistics) -> None:
+        assert metadata["statistic_id"] == hourly_stats.STATISTIC_ID
+        batches.append(statistics)
+
+    monkeypatch.setattr(
+        hourly_stats, "async_add_external_statistics", add_external_statistics
+    )
+    return batches
+
+
+@pytest.fixture
+def statistics(hass: HomeAssistant, freezer) -> DonationStatistics:
+    freezer.move_to(START)
+    return DonationStatistics(hass)
+
+
+async def test_bucket(statistics: DonationStatistics, written: list) -> None:
+    for minutes, total in ((5, 300.0), (10, 100.0), (15, 200.0)):
+        statistics.add(_at(HOUR + datetime.timedelta(minutes=minutes)), total)
+    statistics.async_flush(_at(2 * HOUR))
+
+    [[stat]] = written
+    assert stat["start"] == ELEVEN
+    assert stat["min"] == 100.0
+    assert stat["max"] == 300.0
+    assert stat["mean"] == 200.0
+    assert stat["state"] == 200.0
+
+
+async def test_only_changed_hours_flushed(
+    statistics: DonationStatistics, written: list
+) -> None:
+    statistics.add(_at(HOUR), 100.0)
+    statistics.add(_at(2 * HOUR), 200.0)
+    statistics.async_flush(_at(2 * HOUR))
+    assert [len(batch) for batch in written] == [2]
+
+    # Nothing new, nothing written
+    statistics.async_flush(_at(2 * HOUR))
+    assert len(written) == 1
+
+    # A late sample rewrites just its own hour, with the earlier samples
+    statistics.add(_at(HOUR + datetime.timedelta(minutes=1)), 150.0)
+    statistics.async_flush(_at(2 * HOUR))
+    [stat] = written[-1]
+    assert stat["start"] == ELEVEN
+    assert (stat["min"], stat["max"], stat["state"]) == (100.0, 150.0, 150.0)
+
+
+async def test_late_window(statistics: DonationStatistics, written: list) -> None:
+    statistics.add(_at(HOUR), 100.0)
+    statistics.async_flush(_at(HOUR))
+    # Past the late window the hour is forgotten, samples for it are dropped
+    statistics.async_flush(_at(2 * HOUR + STATISTICS_LATE_WINDOW))
+    statistics.add(_at(HOUR), 50.0)
+    statistics.async_flush(_at(2 * HOUR + STATISTICS_LATE_WINDOW))
+    assert len(written) == 1
+
+
+async def test_restart_leaves_current_hour(
+    statistics: DonationStatistics, written: list
+) -> None:
+    # An earlier run may have written the hour it was started in
+    statistics.add(_at(datetime.timedelta(minutes=5)), 100.0)
+    statistics.async_flush(_at(datetime.timedelta(minutes=10)))
+    assert written == []
+
+    statistics.add(_at(HOUR), 200.0)
+    statistics.async_flush(_at(HOUR))
+    [[stat]] = written
+    assert stat["state"] == 200.0
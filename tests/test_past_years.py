@@ -0,0 +1,42 @@
+"""Past runs fetched by the coordinator for year-over-year comparisons."""
+
+from __future__ import annotations
+
+import datetime
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from desertbus.const import PAST_YEARS_MISSING_TTL  # noqa: E402
+
+MISSING_YEAR = 3
+MISSING_PATH = f"/DB{MISSING_YEAR}/data/DB{MISSING_YEAR}_stats.json"
+
+
+async def _refresh(hass: HomeAssistant, coordinator) -> None:
+    await coordinator.async_refresh()
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+
+async def test_missing_past_year_checked_again(
+    hass: HomeAssistant, coordinator, vst_ninja, freezer
+) -> None:
+    vst_ninja.missing.add(MISSING_YEAR)
+    await _refresh(hass, coordinator)
+    assert MISSING_YEAR - 1 in coordinator.past_runs
+    assert MISSING_YEAR not in coordinator.past_runs
+    assert vst_ninja.requests[MISSING_PATH] == 1
+
+    freezer.tick(PAST_YEARS_MISSING_TTL - datetime.timedelta(minutes=1))
+    await _refresh(hass, coordinator)
+    assert vst_ninja.requests[MISSING_PATH] == 1
+
+    # Published since
+    vst_ninja.missing.clear()
+    freezer.tick(datetime.timedelta(minutes=2))
+    await _refresh(hass, coordinator)
+    assert vst_ninja.requests[MISSING_PATH] == 2
+    assert MISSING_YEAR in coordinator.past_runs
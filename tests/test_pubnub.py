@@ -0,0 +1,397 @@
+"""BusNub against a local stand-in for PubNub."""
+
+from __future__ import annotations
+
+import asyncio
+import collections.abc
+import contextlib
+import datetime
+
+import aiohttp
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+import homeassistant.util.dt as hass_dt  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+from pubnub.enums import PNReconnectionPolicy  # noqa: E402
+from pytest_homeassistant_custom_component.common import (  # noqa: E402
+    async_capture_events)
+
+from desertbus import pubnub_desertbus  # noqa: E402
+from desertbus.const import (DOMAIN, EVENT_HOUR_PURCHASED,  # noqa: E402
+                             HISTORY_BATCH_SIZE, PROJECTION_REFRESH)
+from desertbus.history import DonationHistory  # noqa: E402
+from desertbus.metrics import Metrics  # noqa: E402
+from desertbus.pubnub_desertbus import BusNub  # noqa: E402
+from desertbus.replay import WallClock  # noqa: E402
+from desertbus.storage import DesertBusStore  # noqa: E402
+from desertbus.util import BusMath  # noqa: E402
+
+CHANNEL = "desertbus-test"
+EXTRA_CHANNEL = "desertbus-test-extra"
+
+
+async def _wait_for(condition: collections.abc.Callable[[], bool]) -> None:
+    async with asyncio.timeout(10):
+        while not condition():
+            await asyncio.sleep(0.05)
+
+
+@pytest.fixture
+def expected_lingering_tasks() -> bool:
+    """PubNubAsyncio.stop() leaves its last subscribe request running."""
+    return True
+
+
+@pytest.fixture
+def history(tmp_path) -> DonationHistory:
+    return DonationHistory(str(tmp_path / "timeline"))
+
+
+def _new_bus(
+    hass: HomeAssistant, pubnub_server, history: DonationHistory
+) -> BusNub:
+    bus = BusNub(
+        hass,
+        subscribe_key="sub-c-test",
+        channel=CHANNEL,
+        update_interval=0,
+        store=DesertBusStore(hass, f"{DOMAIN}_test"),
+        history=history,
+        metrics=Metrics(),
+        clock=WallClock(),
+        extra_channels=[EXTRA_CHANNEL],
+    )
+    bus.pn_config.origin = pubnub_server.origin
+    bus.pn_config.ssl = False
+    # Retry straight away rather than backing off
+    bus.pn_config.reconnect_policy = PNReconnectionPolicy.LINEAR
+    bus.pn_config.reconnection_interval = 0
+    return bus
+
+
+@pytest.fixture
+async def bus(hass: HomeAssistant, pubnub_server, history: DonationHistory):
+    bus = _new_bus(hass, pubnub_server, history)
+    yield bus
+    await bus.async_close_api()
+
+
+async def test_latest_fetched_in_background(bus: BusNub, pubnub_server) -> None:
+    pubnub_server.publish(CHANNEL, 1000.0)
+    pubnub_server.publish(CHANNEL, 1005.0)
+    pubnub_server.publish(EXTRA_CHANNEL, 50.0)
+    await bus.async_init_api()
+    # Setup only subscribes, history is left to the background task
+    assert pubnub_server.requests["history"] == 0
+    assert not bus.online
+
+    await bus.async_fetch_latest()
+    assert bus.online
+    assert bus.total_raised == 1005.0
+    assert bus.channels[EXTRA_CHANNEL].total == 50.0
+
+
+async def test_subscribe(bus: BusNub, pubnub_server) -> None:
+    await bus.async_init_api()
+    await _wait_for(lambda: pubnub_server.requests["subscribe"] >= 2)
+
+    pubnub_server.publish(CHANNEL, 2000.0)
+    pubnub_server.publish(EXTRA_CHANNEL, 75.0)
+    await _wait_for(lambda: bus.has_total and bus.total_raised == 2000.0)
+    assert bus.online
+    await _wait_for(lambda: bus.channels[EXTRA_CHANNEL].total == 75.0)
+
+
+@pytest.mark.parametrize(
+    "message", [float("nan"), float("inf"), "1000", None, {"total": 1000}]
+)
+async def test_non_total_ignored(bus: BusNub, message) -> None:
+    bus.handle_message(500.0, 17_000_000_000_000_000)
+    bus.handle_message(message, 17_000_000_010_000_000)
+    bus.handle_message(message, 17_000_000_020_000_000, EXTRA_CHANNEL)
+    assert bus.total_raised == 500.0
+    assert bus.channels[EXTRA_CHANNEL].total is None
+
+
+async def test_backfill_pages(
+    bus: BusNub, pubnub_server, history: DonationHistory
+) -> None:
+    published = [float(total) for total in range(HISTORY_BATCH_SIZE * 5 // 2)]
+    for total in published:
+        pubnub_server.publish(CHANNEL, total)
+    await bus.async_init_api()
+
+    await bus.async_backfill(0)
+    # Back through all three pages, then forward again through the middle one
+    assert pubnub_server.requests["history"] == 4
+    _, totals = await bus.async_timeline(None, None, len(published) * 10)
+    assert totals == published
+
+
+async def test_backfill_retries(
+    bus: BusNub, pubnub_server, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        pubnub_desertbus,
+        "HISTORY_RETRY_BASE_DELAY",
+        datetime.timedelta(milliseconds=10),
+    )
+    published = [float(total) for total in range(HISTORY_BATCH_SIZE * 3 // 2)]
+    for total in published:
+        pubnub_server.publish(CHANNEL, total)
+    pubnub_server.history_failures = 2
+    await bus.async_init_api()
+
+    # Live totals wait for the backfill rather than landing ahead of it
+    bus.handle_message(published[-1] + 1, pubnub_server.timetoken + 10_000)
+    await bus.async_flush_history()
+    assert await bus.async_timeline(None, None, 1000) == ([], [])
+
+    await bus.async_backfill(0)
+    assert pubnub_server.requests["history"] == 4
+    assert bus._metrics.counters["history_retries"] == 2
+    _, totals = await bus.async_timeline(None, None, len(published) * 10)
+    assert totals == [*published, published[-1] + 1]
+
+
+async def test_backfill_resumes(
+    hass: HomeAssistant,
+    bus: BusNub,
+    pubnub_server,
+    history: DonationHistory,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(
+        pubnub_desertbus, "HISTORY_RETRY_BASE_DELAY", datetime.timedelta(hours=1)
+    )
+    published = [float(total) for total in range(HISTORY_BATCH_SIZE * 4)]
+    for total in published:
+        pubnub_server.publish(CHANNEL, total)
+    interrupted = _new_bus(hass, pubnub_server, history)
+    await interrupted.async_init_api()
+    append = history.append
+
+    def append_then_fail(times, totals) -> None:
+        append(times, totals)
+        # Every later request fails, and is retried an hour from now
+        pubnub_server.history_failures = 1000
+
+    history.append = append_then_fail
+    task = hass.async_create_task(interrupted.async_backfill(0))
+    await _wait_for(lambda: interrupted._metrics.counters.get("history_retries"))
+    # Home Assistant restarts meanwhile, keeping the oldest page
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+    await interrupted.async_close_api()
+    assert list(history.read()[1]) == published[:HISTORY_BATCH_SIZE]
+    history.append = append
+    pubnub_server.history_failures = 0
+    requests = pubnub_server.requests["history"]
+
+    await bus.async_init_api()
+    await bus.async_backfill(0)
+    # Back through the three pages not yet stored and on to find nothing
+    # older, then forward through the middle one
+    assert pubnub_server.requests["history"] - requests == 5
+    _, totals = await bus.async_timeline(None, None, len(published) * 10)
+    assert totals == published
+
+
+async def test_pending_bounded(
+    bus: BusNub, pubnub_server, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(pubnub_desertbus, "HISTORY_PENDING_LIMIT", 8)
+    await bus.async_init_api()
+    for total in range(20):
+        bus.handle_message(float(total), pubnub_server.timetoken + total + 1)
+
+    await bus.async_backfill(0)
+    _, totals = await bus.async_timeline(None, None, 100)
+    # Thinned out, but still spanning everything received
+    assert len(totals) <= 8
+    assert totals[0] == 0.0
+    assert totals[-1] == 19.0
+
+
+async def test_reconnect(bus: BusNub, pubnub_server) -> None:
+    await bus.async_init_api()
+    await _wait_for(lambda: pubnub_server.requests["subscribe"] >= 2)
+    pubnub_server.publish(CHANNEL, 3000.0)
+    await _wait_for(lambda: bus.has_total and bus.total_raised == 3000.0)
+
+    pubnub_server.down = True
+    await _wait_for(lambda: pubnub_server.requests["subscribe_failed"] >= 1)
+    # Published while the subscription is down, picked up on reconnect
+    pubnub_server.publish(CHANNEL, 3100.0)
+    pubnub_server.down = False
+    await _wait_for(lambda: bus.total_raised == 3100.0)
+
+    pubnub_server.publish(CHANNEL, 3200.0)
+    await _wait_for(lambda: bus.total_raised == 3200.0)
+
+
+async def test_gap_filled_from_history(bus: BusNub, pubnub_server) -> None:
+    await bus.async_init_api()
+    await _wait_for(lambda: pubnub_server.requests["subscribe"] >= 2)
+    pubnub_server.publish(CHANNEL, 5000.0)
+    await _wait_for(lambda: bus.has_total and bus.total_raised == 5000.0)
+    totals: list[float] = []
+    bus.register_callback(lambda: totals.append(bus.total_raised))
+
+    pubnub_server.down = True
+    await _wait_for(lambda: pubnub_server.requests["subscribe_failed"] >= 1)
+    history_requests = pubnub_server.requests["history"]
+    # Lost from the subscription, only history has them
+    pubnub_server.publish(CHANNEL, 5100.0, live=False)
+    pubnub_server.publish(CHANNEL, 5200.0, live=False)
+    pubnub_server.down = False
+    pubnub_server.publish(CHANNEL, 5300.0)
+    await _wait_for(lambda: bus.total_raised == 5300.0)
+
+    assert pubnub_server.requests["history"] > history_requests
+    assert totals == [5100.0, 5200.0, 5300.0]
+
+
+async def test_resubscribe_after_giving_up(
+    bus: BusNub, pubnub_server, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        pubnub_desertbus,
+        "PUBNUB_RESUBSCRIBE_DELAY",
+        datetime.timedelta(milliseconds=100),
+    )
+    bus.pn_config.maximum_reconnection_retries = 2
+    await bus.async_init_api()
+    await _wait_for(lambda: pubnub_server.requests["subscribe"] >= 2)
+    pubnub_server.publish(CHANNEL, 4000.0)
+    await _wait_for(lambda: bus.has_total and bus.total_raised == 4000.0)
+
+    pubnub_server.down = True
+    # Long enough for the event engine to run out of retries more than once
+    await _wait_for(lambda: pubnub_server.requests["subscribe_failed"] >= 8)
+    pubnub_server.publish(CHANNEL, 4100.0)
+    pubnub_server.down = False
+    await _wait_for(lambda: bus.total_raised == 4100.0)
+
+    pubnub_server.publish(CHANNEL, 4200.0)
+    await _wait_for(lambda: bus.total_raised == 4200.0)
+
+
+async def test_requests_use_shared_session(
+    hass: HomeAssistant, bus: BusNub, pubnub_server, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Guards the request handler, which relies on pubnub 10.x internals."""
+    requested: list[str] = []
+
+    async def on_request_start(session, context, params) -> None:
+        requested.append(params.url.path)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    session = aiohttp.ClientSession(trace_configs=[trace_config])
+    monkeypatch.setattr(
+        pubnub_desertbus, "async_get_clientsession", lambda hass: session
+    )
+    try:
+        await bus.async_init_api()
+        await _wait_for(lambda: pubnub_server.requests["subscribe"] >= 2)
+        await bus.async_fetch_latest()
+        assert any("/subscribe/" in path for path in requested)
+        assert any("/history/" in path for path in requested)
+
+        await bus.async_close_api()
+        # Home Assistant's session outlives the integration
+        assert not session.closed
+    finally:
+        await session.close()
+
+
+class _Messages:
+    """Apply totals to the bus as if they had just been published."""
+
+    def __init__(self, bus: BusNub) -> None:
+        self._bus = bus
+        self._timetoken = 17_000_000_000_000_000
+
+    def __call__(self, total: float) -> int:
+        self._timetoken += 10_000_000
+        self._bus.do_callbacks(total, self._timetoken)
+        return self._timetoken
+
+
+async def _hours_announced(hass: HomeAssistant, events: list) -> list[int]:
+    await hass.async_block_till_done()
+    return [event.data["hour"] for event in events]
+
+
+async def test_hour_purchased(hass: HomeAssistant, bus: BusNub) -> None:
+    events = async_capture_events(hass, EVENT_HOUR_PURCHASED)
+    message = _Messages(bus)
+    message(BusMath.hours_to_dollars(5))
+    message(BusMath.hours_to_dollars(6) - 0.01)
+    assert await _hours_announced(hass, events) == []
+
+    timetoken = message(BusMath.hours_to_dollars(6))
+    assert await _hours_announced(hass, events) == [6]
+    assert events[0].data["timestamp"] == (
+        hass_dt.utc_from_timestamp(timetoken / 10_000_000).isoformat()
+    )
+
+
+async def test_hours_purchased_at_once(hass: HomeAssistant, bus: BusNub) -> None:
+    events = async_capture_events(hass, EVENT_HOUR_PURCHASED)
+    message = _Messages(bus)
+    message(BusMath.hours_to_dollars(5))
+    # One donation buying several hours announces each of them
+    message(BusMath.hours_to_dollars(9) + 1)
+    assert await _hours_announced(hass, events) == [6, 7, 8, 9]
+
+    # Never twice, even if the total dips and recovers
+    message(BusMath.hours_to_dollars(8))
+    message(BusMath.hours_to_dollars(9))
+    assert await _hours_announced(hass, events) == [6, 7, 8, 9]
+
+
+async def test_hours_baseline_after_restart(
+    hass: HomeAssistant, history: DonationHistory
+) -> None:
+    store = DesertBusStore(hass, f"{DOMAIN}_test")
+    store.data["total_raised"] = BusMath.hours_to_dollars(2)
+    bus = BusNub(
+        hass,
+        subscribe_key="sub-c-test",
+        channel=CHANNEL,
+        update_interval=0,
+        store=store,
+        history=history,
+        metrics=Metrics(),
+        clock=WallClock(),
+    )
+    assert bus.total_raised == BusMath.hours_to_dollars(2)
+    events = async_capture_events(hass, EVENT_HOUR_PURCHASED)
+    message = _Messages(bus)
+    # Hours bought while it was down aren't announced after the fact
+    message(BusMath.hours_to_dollars(7))
+    assert await _hours_announced(hass, events) == []
+
+    message(BusMath.hours_to_dollars(8))
+    assert await _hours_announced(hass, events) == [8]
+
+
+async def test_projection_decays(hass: HomeAssistant, bus: BusNub, freezer) -> None:
+    message = _Messages(bus)
+    freezer.move_to(hass_dt.utc_from_timestamp(message(1000.0) / 10_000_000))
+    message(1100.0)
+    start_time = hass_dt.now() - datetime.timedelta(hours=1)
+    first = bus.projection(start_time)
+    assert first is not None
+    assert bus.projection(start_time) is first
+
+    # Nothing donated since, so the projection falls with the smoothed rate
+    freezer.tick(PROJECTION_REFRESH)
+    second = bus.projection(start_time)
+    assert second is not None
+    assert second.final_total < first.final_total
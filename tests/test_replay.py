@@ -0,0 +1,78 @@
+"""Replaying a recorded timeline end to end."""
+
+from __future__ import annotations
+
+import asyncio
+import collections.abc
+import datetime
+from array import array
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+import homeassistant.util.dt as hass_dt  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+from pytest_homeassistant_custom_component.common import (  # noqa: E402
+    MockEntityPlatform, async_fire_time_changed)
+
+from desertbus import sensor  # noqa: E402
+from desertbus.const import (CONF_REPLAY_PATH, CONF_REPLAY_SPEED,  # noqa: E402
+                             DOMAIN)
+from desertbus.history import DonationHistory  # noqa: E402
+from desertbus.storage import STORAGE_SAVE_DELAY, STORAGE_VERSION  # noqa: E402
+
+# Ten minutes of a run, a hundred dollars a minute
+TIMES = array("d", [1_794_000_000.0 + minute * 60 for minute in range(10)])
+TOTALS = array("d", [1000.0 + minute * 100 for minute in range(10)])
+# Over in a second
+SPEED = 600.0
+
+
+async def _wait_for(condition: collections.abc.Callable[[], bool]) -> None:
+    async with asyncio.timeout(10):
+        while not condition():
+            await asyncio.sleep(0.05)
+
+
+async def test_replay(
+    hass: HomeAssistant, hass_storage, tmp_path, setup_entry
+) -> None:
+    path = str(tmp_path / "recorded")
+    DonationHistory(path).append(TIMES, TOTALS)
+    # The real run's snapshot, which a replay must neither read nor replace
+    real_run = {
+        "version": STORAGE_VERSION,
+        "key": DOMAIN,
+        "data": {"total_raised": 50_000.0, "total_timestamp": TIMES[-1]},
+    }
+    hass_storage[DOMAIN] = real_run
+
+    coordinator = await setup_entry(
+        data={"subscribe_key": "sub-c-test", "channel": "desertbus-test"},
+        options={CONF_REPLAY_PATH: path, CONF_REPLAY_SPEED: SPEED},
+    )
+    assert coordinator.data.start_time.timestamp() == TIMES[0]
+    entities: list = []
+    await sensor.async_setup_entry(hass, coordinator.config_entry, entities.extend)
+    await MockEntityPlatform(hass).async_add_entities(entities)
+    raised = next(
+        entity for entity in entities if type(entity) is sensor.RaisedSensor
+    )
+
+    await _wait_for(
+        lambda: hass.states.get(raised.entity_id).state == str(TOTALS[-1])
+    )
+    api = hass.data[DOMAIN][coordinator.config_entry.entry_id]["api"]
+    assert api.total_raised == TOTALS[-1]
+
+    async_fire_time_changed(
+        hass,
+        hass_dt.utcnow() + datetime.timedelta(seconds=STORAGE_SAVE_DELAY + 1),
+    )
+    await hass.async_block_till_done()
+    assert hass_storage[DOMAIN] == real_run
+    assert sorted(hass_storage) == [DOMAIN]
+
+    for entity in entities:
+        await entity.async_remove()
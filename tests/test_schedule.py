@@ -0,0 +1,144 @@
+"""Run phases and coordinator wake-ups."""
+
+from __future__ import annotations
+
+import datetime
+
+import pytest
+
+from desertbus.const import (BUS_TIMEZONE, MIN_UPDATE_INTERVAL,
+                             PHASE_STATS_INTERVALS, PHASES, RATE_LIMITS)
+from desertbus.schedule import get_phase, next_wakeup
+
+START = datetime.datetime(2025, 11, 14, 10, tzinfo=BUS_TIMEZONE)
+HOURS = 167
+END = START + datetime.timedelta(hours=HOURS)
+
+
+def _at(*args: int) -> datetime.datetime:
+    return datetime.datetime(*args, tzinfo=BUS_TIMEZONE)
+
+
+@pytest.mark.parametrize(
+    ("now", "start_time", "run_purchased", "phase"),
+    [
+        # Nothing announced yet
+        (_at(2025, 10, 31, 23, 59), None, 0, PHASES.OFF_SEASON),
+        (_at(2025, 11, 1), None, 0, PHASES.PRE_ANNOUNCEMENT),
+        (_at(2025, 12, 1), None, 0, PHASES.OFF_SEASON),
+        # Announced, counting down to the start
+        (START - datetime.timedelta(seconds=1), START, 0, PHASES.PRE_RUN),
+        (START - datetime.timedelta(seconds=1), START, HOURS, PHASES.PRE_RUN),
+        (START, START, HOURS, PHASES.RUNNING),
+        (END - datetime.timedelta(seconds=1), START, HOURS, PHASES.RUNNING),
+        # Started, but the stats haven't bought any hours yet
+        (START + datetime.timedelta(hours=1), START, 0, PHASES.RUNNING),
+        (END, START, HOURS, PHASES.POST_RUN),
+        (_at(2025, 11, 30, 23, 59), START, HOURS, PHASES.POST_RUN),
+        (_at(2025, 12, 1), START, HOURS, PHASES.OFF_SEASON),
+        (_at(2026, 6, 1), START, HOURS, PHASES.OFF_SEASON),
+        # Still last year's run in November
+        (_at(2026, 11, 1), START, HOURS, PHASES.PRE_ANNOUNCEMENT),
+        (_at(2026, 11, 1), START, 0, PHASES.PRE_ANNOUNCEMENT),
+    ],
+)
+def test_get_phase(
+    now: datetime.datetime,
+    start_time: datetime.datetime | None,
+    run_purchased: int,
+    phase: str,
+) -> None:
+    assert get_phase(now, start_time, run_purchased) == phase
+
+
+@pytest.mark.parametrize(
+    ("now", "phase", "start_time", "wakeup"),
+    [
+        # Weekly in the off season, unless November comes first
+        (
+            _at(2026, 3, 1),
+            PHASES.OFF_SEASON,
+            START,
+            _at(2026, 3, 1) + PHASE_STATS_INTERVALS[PHASES.OFF_SEASON],
+        ),
+        (_at(2026, 10, 28), PHASES.OFF_SEASON, START, _at(2026, 11, 1)),
+        (_at(2025, 12, 30), PHASES.OFF_SEASON, START, _at(2026, 1, 6)),
+        # Daily until the run is announced
+        (
+            _at(2026, 11, 1),
+            PHASES.PRE_ANNOUNCEMENT,
+            START,
+            _at(2026, 11, 2),
+        ),
+        # The start of the run, if it comes before the next stats check
+        (
+            START - datetime.timedelta(minutes=5),
+            PHASES.PRE_RUN,
+            START,
+            START,
+        ),
+        (
+            START - datetime.timedelta(hours=1),
+            PHASES.PRE_RUN,
+            START,
+            START
+            - datetime.timedelta(hours=1)
+            + PHASE_STATS_INTERVALS[PHASES.PRE_RUN],
+        ),
+        # The omega shift check is the most frequent while bussing
+        (
+            START + datetime.timedelta(hours=1),
+            PHASES.RUNNING,
+            START,
+            START + datetime.timedelta(hours=1) + RATE_LIMITS["OMEGA_SHIFT"],
+        ),
+        # Then the end of the run
+        (
+            END - datetime.timedelta(minutes=1),
+            PHASES.RUNNING,
+            START,
+            END,
+        ),
+        (
+            END,
+            PHASES.POST_RUN,
+            START,
+            END + PHASE_STATS_INTERVALS[PHASES.POST_RUN],
+        ),
+    ],
+)
+def test_next_wakeup(
+    now: datetime.datetime,
+    phase: str,
+    start_time: datetime.datetime,
+    wakeup: datetime.datetime,
+) -> None:
+    assert next_wakeup(now, phase, start_time, HOURS, now, now) == wakeup
+
+
+def test_next_wakeup_uses_last_checks() -> None:
+    now = START + datetime.timedelta(hours=1)
+    last_stats_attempt = now - datetime.timedelta(minutes=14)
+    last_omega_check = now - datetime.timedelta(minutes=5)
+    assert next_wakeup(
+        now, PHASES.RUNNING, START, HOURS, last_stats_attempt, last_omega_check
+    ) == last_stats_attempt + PHASE_STATS_INTERVALS[PHASES.RUNNING]
+
+
+@pytest.mark.parametrize("phase", list(PHASE_STATS_INTERVALS))
+def test_next_wakeup_clamped(phase: str) -> None:
+    """Overdue checks don't make the coordinator spin."""
+    now = START + datetime.timedelta(hours=1)
+    overdue = now - datetime.timedelta(weeks=2)
+    assert (
+        next_wakeup(now, phase, START, HOURS, overdue, overdue)
+        == now + MIN_UPDATE_INTERVAL
+    )
+
+
+def test_next_wakeup_clamped_at_start() -> None:
+    now = START - datetime.timedelta(seconds=1)
+    assert (
+        next_wakeup(now, PHASES.PRE_RUN, START, HOURS, now, now)
+        == now + MIN_UPDATE_INTERVAL
+    )
@@ -0,0 +1,19 @@
+"""The desertbus.org page scrape."""
+
+from __future__ import annotations
+
+import pytest
+
+from desertbus.scrape import parse_db_page
+
+
+def test_parse_db_page(db_page: bytes) -> None:
+    assert parse_db_page(db_page) == {
+        "start-time": "2025-11-14T10:00:00",
+        "total-raised": "1158314.33",
+    }
+
+
+def test_parse_db_page_missing_fields() -> None:
+    with pytest.raises(ValueError):
+        parse_db_page(b"<html><body>nothing</body></html>")
@@ -0,0 +1,157 @@
+"""Which state writes the live sensors make and which they skip."""
+
+from __future__ import annotations
+
+import datetime
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+from pytest_homeassistant_custom_component.common import (  # noqa: E402
+    MockEntityPlatform, async_fire_time_changed)
+
+from desertbus.const import DOMAIN, STATISTICS_STATE_INTERVAL  # noqa: E402
+from desertbus.history import DonationHistory  # noqa: E402
+from desertbus.hourly_stats import DonationStatistics  # noqa: E402
+from desertbus.metrics import Metrics  # noqa: E402
+from desertbus.pubnub_desertbus import BusNub  # noqa: E402
+from desertbus.replay import WallClock  # noqa: E402
+from desertbus.sensor import (RaisedSensor,  # noqa: E402
+                              RaisedVsPreviousFinalSensor)
+from desertbus.storage import DesertBusStore  # noqa: E402
+
+# Longer than any test runs
+NEVER = 3600.0
+
+
+class _Bus:
+    """A BusNub fed totals directly, and the writes its sensors made."""
+
+    def __init__(self, hass: HomeAssistant, tmp_path, statistics: bool) -> None:
+        self.api = BusNub(
+            hass,
+            subscribe_key="sub-c-test",
+            channel="desertbus-test",
+            update_interval=0,
+            store=DesertBusStore(hass, f"{DOMAIN}_test"),
+            history=DonationHistory(str(tmp_path / "timeline")),
+            metrics=Metrics(),
+            clock=WallClock(),
+            statistics=DonationStatistics(hass) if statistics else None,
+        )
+        self._hass = hass
+        self._timetoken = 17_000_000_000_000_000
+
+    async def publish(self, total: float) -> None:
+        self._timetoken += 10_000_000
+        self.api.do_callbacks(total, self._timetoken)
+        await self._hass.async_block_till_done()
+
+    @property
+    def writes(self) -> int:
+        return self.api.state_writes
+
+    @property
+    def suppressed(self) -> int:
+        return self.api.suppressed_writes
+
+
+@pytest.fixture
+def bus(hass: HomeAssistant, tmp_path) -> _Bus:
+    return _Bus(hass, tmp_path, statistics=False)
+
+
+async def _add(hass: HomeAssistant, sensor):
+    """Add a sensor, which writes it unavailable until there's a total."""
+    await MockEntityPlatform(hass).async_add_entities([sensor])
+    return sensor
+
+
+def _state(hass: HomeAssistant, sensor) -> str:
+    return hass.states.get(sensor.entity_id).state
+
+
+async def test_min_delta(hass: HomeAssistant, bus: _Bus) -> None:
+    sensor = await _add(hass, RaisedSensor(bus.api, min_delta=1.0, max_age=NEVER))
+    await bus.publish(1000.0)
+    assert (bus.writes, bus.suppressed) == (2, 0)
+
+    await bus.publish(1000.5)
+    assert (bus.writes, bus.suppressed) == (2, 1)
+    assert _state(hass, sensor) == "1000.0"
+
+    # Measured from the last write, not the last total seen
+    await bus.publish(1001.25)
+    assert (bus.writes, bus.suppressed) == (3, 1)
+    assert _state(hass, sensor) == "1001.25"
+
+
+async def test_max_age(hass: HomeAssistant, bus: _Bus, freezer) -> None:
+    await _add(hass, RaisedSensor(bus.api, min_delta=1.0, max_age=60.0))
+    await bus.publish(1000.0)
+    freezer.tick(datetime.timedelta(seconds=59))
+    await bus.publish(1000.0)
+    assert (bus.writes, bus.suppressed) == (2, 1)
+
+    # Rewritten unchanged once the last write is old enough
+    freezer.tick(datetime.timedelta(seconds=2))
+    await bus.publish(1000.0)
+    assert (bus.writes, bus.suppressed) == (3, 1)
+
+
+async def test_statistics_mode_throttled(
+    hass: HomeAssistant, tmp_path, freezer
+) -> None:
+    bus = _Bus(hass, tmp_path, statistics=True)
+    sensor = await _add(hass, RaisedSensor(bus.api))
+    # The first total goes out straight away
+    await bus.publish(1000.0)
+    assert bus.writes == 2
+    assert _state(hass, sensor) == "1000.0"
+
+    await bus.publish(1100.0)
+    await bus.publish(1200.0)
+    assert bus.writes == 2
+
+    # Then only the latest, once the interval is up
+    freezer.tick(STATISTICS_STATE_INTERVAL)
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+    assert bus.writes == 3
+    assert _state(hass, sensor) == "1200.0"
+
+    # Nothing pending is written once removed
+    await bus.publish(1300.0)
+    await sensor.async_remove()
+    freezer.tick(STATISTICS_STATE_INTERVAL)
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+    assert bus.writes == 3
+
+
+async def test_past_finals_percent_not_compared(
+    hass: HomeAssistant, bus: _Bus, coordinator
+) -> None:
+    await coordinator.async_refresh()
+    await hass.async_block_till_done(wait_background_tasks=True)
+    previous = coordinator.past_runs[coordinator.data.db_year - 1]["total_raised"]
+    sensor = await _add(
+        hass,
+        RaisedVsPreviousFinalSensor(
+            bus.api, coordinator, min_delta=previous / 100, max_age=NEVER
+        ),
+    )
+    await bus.publish(previous / 2)
+    written = hass.states.get(sensor.entity_id).attributes
+    assert written["percent_of_previous_final"] == 50.0
+
+    # Half a percent further on, within min_delta
+    await bus.publish(previous * 0.505)
+    assert (bus.writes, bus.suppressed) == (2, 1)
+
+    await bus.publish(previous * 0.52)
+    assert bus.writes == 3
+    written = hass.states.get(sensor.entity_id).attributes
+    assert written["percent_of_previous_final"] == 52.0
@@ -0,0 +1,88 @@
+"""The shift timer on the coordinator."""
+
+from __future__ import annotations
+
+import datetime
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+from pytest_homeassistant_custom_component.common import (  # noqa: E402
+    async_fire_time_changed)
+
+from desertbus.const import BUS_TIMEZONE, SHIFTS  # noqa: E402
+
+BEFORE_NOON = datetime.datetime(2026, 11, 14, 11, 59, 30, tzinfo=BUS_TIMEZONE)
+
+
+def _bus_time(day: int, hour: int, minute: int = 0) -> datetime.datetime:
+    return datetime.datetime(2026, 11, day, hour, minute, tzinfo=BUS_TIMEZONE)
+
+
+@pytest.fixture
+def before_noon(freezer):
+    """Frozen half a minute before Dawn Guard hands over to Alpha Flight.
+
+    Requested ahead of the coordinator, which schedules its first shift
+    change when it is created.
+    """
+    freezer.move_to(BEFORE_NOON)
+    return freezer
+
+
+async def _elapse(hass: HomeAssistant, freezer, delta: datetime.timedelta) -> None:
+    freezer.tick(delta)
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+
+
+@pytest.mark.parametrize(
+    ("bus_now", "shift", "next_start"),
+    [
+        (_bus_time(14, 0), SHIFTS.ZETA, _bus_time(14, 6)),
+        (_bus_time(14, 11, 59), SHIFTS.DAWN, _bus_time(14, 12)),
+        (_bus_time(14, 12), SHIFTS.ALPHA, _bus_time(14, 18)),
+        # Night Watch runs into the next day
+        (_bus_time(14, 23, 59), SHIFTS.NIGHT, _bus_time(15, 0)),
+    ],
+)
+async def test_shift_at(
+    coordinator, bus_now: datetime.datetime, shift: str, next_start
+) -> None:
+    assert coordinator._shift_at(bus_now) == (shift, next_start)
+
+
+async def test_shift_changes_on_time(
+    hass: HomeAssistant, before_noon, coordinator
+) -> None:
+    await coordinator.async_refresh()
+    await hass.async_block_till_done(wait_background_tasks=True)
+    assert coordinator.data.current_shift == SHIFTS.DAWN
+    shifts: list[str] = []
+    coordinator.async_add_listener(
+        lambda: shifts.append(coordinator.data.current_shift)
+    )
+
+    await _elapse(hass, before_noon, datetime.timedelta(seconds=20))
+    assert shifts == []
+
+    await _elapse(hass, before_noon, datetime.timedelta(seconds=20))
+    assert shifts == [SHIFTS.ALPHA]
+    assert coordinator.current_shift == SHIFTS.ALPHA
+
+    # Rescheduled for the one after
+    await _elapse(hass, before_noon, datetime.timedelta(hours=6))
+    assert shifts[-1] == SHIFTS.NIGHT
+    assert coordinator.current_shift == SHIFTS.NIGHT
+
+
+async def test_shift_timer_cancelled(
+    hass: HomeAssistant, before_noon, coordinator
+) -> None:
+    assert coordinator.current_shift == SHIFTS.DAWN
+    await coordinator.async_shutdown()
+
+    await _elapse(hass, before_noon, datetime.timedelta(minutes=1))
+    assert coordinator.current_shift == SHIFTS.DAWN
@@ -0,0 +1,77 @@
+"""How often the coordinator checks for stats, found or not."""
+
+from __future__ import annotations
+
+import datetime
+import logging
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from desertbus.const import (BREAKER_THRESHOLD, BUS_TIMEZONE,  # noqa: E402
+                             PHASE_STATS_INTERVALS, PHASES)
+
+# Last year's run is over and this year's isn't announced
+NOVEMBER = datetime.datetime(2026, 11, 2, 12, tzinfo=BUS_TIMEZONE)
+DB_YEAR = 20
+STATS_PATH = f"/DB{DB_YEAR}/data/DB{DB_YEAR}_stats.json"
+PAGE_PATH = "/2026/"
+
+
+async def _refresh(hass: HomeAssistant, coordinator) -> None:
+    await coordinator.async_refresh()
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+
+async def test_not_published_checked_daily(
+    hass: HomeAssistant, coordinator, vst_ninja, freezer
+) -> None:
+    freezer.move_to(NOVEMBER)
+    vst_ninja.missing.update((DB_YEAR, 2026))
+    # Early in the month the stats 404 falls back to last year's run
+    await _refresh(hass, coordinator)
+    assert coordinator.phase == PHASES.PRE_ANNOUNCEMENT
+    assert coordinator.data.db_year == DB_YEAR - 1
+
+    # Later on the page is scraped for the start time, and isn't up either
+    freezer.move_to(NOVEMBER + datetime.timedelta(days=7))
+    await _refresh(hass, coordinator)
+    assert vst_ninja.requests[STATS_PATH] == 2
+    assert vst_ninja.requests[PAGE_PATH] == 1
+    assert (
+        coordinator.update_interval
+        == PHASE_STATS_INTERVALS[PHASES.PRE_ANNOUNCEMENT]
+    )
+
+    # Not asked again until the next day
+    freezer.tick(datetime.timedelta(hours=23))
+    await _refresh(hass, coordinator)
+    assert vst_ninja.requests[STATS_PATH] == 2
+    assert vst_ninja.requests[PAGE_PATH] == 1
+
+    freezer.tick(datetime.timedelta(hours=1))
+    await _refresh(hass, coordinator)
+    assert vst_ninja.requests[STATS_PATH] == 3
+    assert vst_ninja.requests[PAGE_PATH] == 2
+
+
+async def test_not_published_isnt_a_failure(
+    hass: HomeAssistant, coordinator, vst_ninja, freezer, caplog
+) -> None:
+    freezer.move_to(NOVEMBER)
+    vst_ninja.missing.update((DB_YEAR, 2026))
+    await _refresh(hass, coordinator)
+
+    for _ in range(BREAKER_THRESHOLD):
+        freezer.tick(PHASE_STATS_INTERVALS[PHASES.PRE_ANNOUNCEMENT] * 7)
+        await _refresh(hass, coordinator)
+    assert coordinator.last_update_success
+    assert not coordinator.data.stats_stale
+    assert coordinator.breakers["stats"].failures == 0
+    assert coordinator.breakers["scrape"].failures == 0
+    assert not [
+        record for record in caplog.records if record.levelno >= logging.ERROR
+    ]
@@ -0,0 +1,125 @@
+"""Warm starts from the snapshot saved across restarts."""
+
+from __future__ import annotations
+
+import json
+import logging
+import typing
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from desertbus.const import DOMAIN  # noqa: E402
+from desertbus.storage import STORAGE_VERSION, DesertBusStore  # noqa: E402
+
+
+@pytest.fixture
+async def snapshot(hass: HomeAssistant, coordinator) -> dict[str, typing.Any]:
+    """What a refreshed coordinator saves, as read back from disk."""
+    await coordinator.async_refresh()
+    await hass.async_block_till_done(wait_background_tasks=True)
+    return json.loads(json.dumps(coordinator._store.data))
+
+
+def _stats_requests(vst_ninja) -> int:
+    return sum(
+        count for path, count in vst_ninja.requests.items() if path.endswith(".json")
+    )
+
+
+async def test_restore_round_trip(
+    hass: HomeAssistant, coordinator, snapshot, vst_ninja
+) -> None:
+    restored = DesertBusStore(hass, f"{DOMAIN}_restored")
+    requests = sum(vst_ninja.requests.values())
+    other = type(coordinator)(
+        hass,
+        logging.getLogger(__name__),
+        config_entry=coordinator.config_entry,
+        name=DOMAIN,
+        update_interval=coordinator.update_interval,
+        always_update=False,
+        store=restored,
+        metrics=coordinator.metrics,
+    )
+    try:
+        assert other.async_restore(snapshot)
+        assert other.data == coordinator.data
+        assert sum(vst_ninja.requests.values()) == requests
+    finally:
+        await other.async_shutdown()
+
+
+async def test_warm_start_skips_first_fetch(
+    hass: HomeAssistant, hass_storage, snapshot, vst_ninja, setup_entry
+) -> None:
+    hass_storage[DOMAIN] = {
+        "version": STORAGE_VERSION,
+        "key": DOMAIN,
+        "data": snapshot,
+    }
+    requests = _stats_requests(vst_ninja)
+
+    coordinator = await setup_entry()
+    assert coordinator.data.total_raised == snapshot["coordinator"]["total_raised"]
+    # Checked moments ago, the revalidation doesn't ask again
+    assert _stats_requests(vst_ninja) == requests
+
+
+async def test_cold_start_without_snapshot(
+    hass: HomeAssistant, vst_ninja, setup_entry
+) -> None:
+    coordinator = await setup_entry()
+    assert coordinator.data is not None
+    assert _stats_requests(vst_ninja) >= 1
+
+
+async def test_old_format_discarded(
+    hass: HomeAssistant, hass_storage, snapshot, vst_ninja, setup_entry
+) -> None:
+    hass_storage[DOMAIN] = {
+        "version": STORAGE_VERSION - 1,
+        "key": DOMAIN,
+        "data": snapshot,
+    }
+    requests = _stats_requests(vst_ninja)
+
+    coordinator = await setup_entry()
+    assert coordinator.data is not None
+    assert _stats_requests(vst_ninja) > requests
+    assert await DesertBusStore(hass).async_load() == {}
+
+
+@pytest.mark.parametrize(
+    "damage",
+    [
+        {"last_stats_check": "yesterday"},
+        {"last_omega_check": None},
+        {"coordinator": ["not", "stats"]},
+        {"coordinator": {"total_raised": 1000.0}},
+    ],
+)
+async def test_unreadable_snapshot_fetched_afresh(
+    hass: HomeAssistant,
+    hass_storage,
+    snapshot,
+    vst_ninja,
+    setup_entry,
+    caplog: pytest.LogCaptureFixture,
+    damage: dict[str, typing.Any],
+) -> None:
+    hass_storage[DOMAIN] = {
+        "version": STORAGE_VERSION,
+        "key": DOMAIN,
+        "data": {**snapshot, **damage},
+    }
+    requests = _stats_requests(vst_ninja)
+
+    coordinator = await setup_entry()
+    assert coordinator.data is not None
+    assert coordinator.last_update_success
+    assert _stats_requests(vst_ninja) > requests
+    assert "Ignoring unreadable saved stats" in caplog.text
@@ -0,0 +1,99 @@
+"""The in-memory donation timeline and smoothed rate behind the sensors."""
+
+from __future__ import annotations
+
+import math
+
+import pytest
+
+from desertbus.timeline import DonationTimeline, EwmaRate
+
+
+def _timeline(samples: list[tuple[float, float]]) -> DonationTimeline:
+    timeline = DonationTimeline(4)
+    for timestamp, total in samples:
+        timeline.append(timestamp, total)
+    return timeline
+
+
+def test_empty() -> None:
+    timeline = DonationTimeline(4)
+    assert timeline.latest() is None
+    assert timeline.oldest() is None
+    assert timeline.total_at(0) is None
+    assert timeline.rate(60, 0) is None
+
+
+def test_wraparound() -> None:
+    timeline = _timeline([(minute * 60, minute * 10.0) for minute in range(10)])
+    assert len(timeline) == 4
+    assert timeline.oldest() == (360, 60.0)
+    assert timeline.latest() == (540, 90.0)
+    assert timeline.total_at(359) is None
+    assert timeline.total_at(420) == 70.0
+    assert timeline.total_at(479) == 70.0
+    assert timeline.total_at(1000) == 90.0
+
+
+@pytest.mark.parametrize(
+    ("window", "now", "rate"),
+    [
+        # Ten dollars a minute
+        (120, 540, 10 / 60),
+        # Nothing since the latest sample
+        (60, 600, 0.0),
+        # Past the oldest sample the rate is over what the buffer holds
+        (3600, 540, 30 / 180),
+    ],
+)
+def test_rate_after_wraparound(window: float, now: float, rate: float) -> None:
+    timeline = _timeline([(minute * 60, minute * 10.0) for minute in range(10)])
+    assert timeline.rate(window, now) == pytest.approx(rate)
+
+
+def test_late_sample_folded_in() -> None:
+    timeline = _timeline([(60, 10.0), (30, 20.0)])
+    assert timeline.latest() == (60, 20.0)
+
+
+def test_gap_starts_over() -> None:
+    timeline = _timeline([(0, 100.0), (60, 110.0)])
+    timeline.mark_gap()
+    # An hour later, with everything raised meanwhile in one step
+    timeline.append(3660, 5000.0)
+    assert len(timeline) == 1
+    assert timeline.rate(300, 3660) == 0.0
+
+    timeline.append(3720, 5060.0)
+    assert timeline.rate(300, 3720) == pytest.approx(1.0)
+
+
+def test_gap_filled() -> None:
+    timeline = _timeline([(0, 100.0), (60, 110.0)])
+    timeline.mark_gap()
+    timeline.unmark_gap()
+    timeline.append(120, 120.0)
+    assert len(timeline) == 3
+    assert timeline.rate(120, 120) == pytest.approx(20 / 120)
+
+
+def test_ewma_decays_in_silence() -> None:
+    rate = EwmaRate(600)
+    rate.update(0, 0.0)
+    assert rate.rate_at(0) is None
+    rate.update(60, 60.0)
+    assert rate.rate_at(60) == 1.0
+    # Never more than the last measured rate, even before the last sample
+    assert rate.rate_at(0) == 1.0
+    assert rate.rate_at(660) == pytest.approx(math.exp(-1))
+    assert rate.rate_at(1260) == pytest.approx(math.exp(-2))
+
+
+def test_ewma_quiet_sample_matches_silence() -> None:
+    rate = EwmaRate(600)
+    rate.update(0, 0.0)
+    rate.update(60, 60.0)
+    silent = rate.rate_at(120)
+    # A message with an unchanged total is a minute of nothing raised
+    rate.update(120, 60.0)
+    assert rate.rate_at(120) == pytest.approx(silent)
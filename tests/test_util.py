@@ -0,0 +1,128 @@
+"""BusMath's cost table and the projections built on it."""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from desertbus import util
+from desertbus.util import BusMath, BusProjection, BusSnapshot, _cost_table
+
+RATES = [1.07, 1.05, 1.1]
+# Past this a float total no longer holds every cent
+EXACT_DOLLARS = 1e12
+
+
+@pytest.mark.parametrize(
+    ("hours", "dollars"),
+    [
+        (0, 0.0),
+        (1, 1.0),
+        (24, 58.18),
+        (50, 406.52),
+        # Summed from prices rounded to the cent, the closed form gave 12381.66
+        (100, 12381.69),
+        (168, 1234160.36),
+    ],
+)
+def test_hours_to_dollars(hours: int, dollars: float) -> None:
+    assert BusMath.hours_to_dollars(hours) == dollars
+    assert BusMath.dollars_to_hours(dollars) == hours
+
+
+@pytest.mark.parametrize("rate", RATES)
+def test_round_trip_every_hour(rate: float) -> None:
+    hour = 0
+    while (cost := BusMath.hours_to_dollars(hour, rate)) < EXACT_DOLLARS:
+        assert BusMath.dollars_to_hours(cost, rate) == hour
+        hour += 1
+
+
+@pytest.mark.parametrize("rate", RATES)
+@pytest.mark.parametrize("hour", [1, 24, 100, 168])
+def test_hour_boundaries(rate: float, hour: int) -> None:
+    cents = round(BusMath.hours_to_dollars(hour, rate) * 100)
+    assert BusMath.dollars_to_hours((cents - 1) / 100, rate) == hour - 1
+    assert BusMath.dollars_to_hours(cents / 100, rate) == hour
+    assert BusMath.dollars_to_hours((cents + 1) / 100, rate) == hour
+
+
+def test_price_sums_to_cost() -> None:
+    total = 0
+    for hour in range(200):
+        assert round(BusMath.hours_to_dollars(hour) * 100) == total
+        total += round(BusMath.price_for_hour(hour) * 100)
+
+
+@pytest.mark.parametrize("dollars", [1e20, float("inf"), 2**70])
+def test_clamped_to_table_bound(dollars: float) -> None:
+    table = _cost_table(1.07)
+    bound = BusMath.dollars_to_hours(dollars)
+    assert table.full
+    assert bound == len(table.cumulative) - 1
+    assert BusMath.hours_to_dollars(bound + 1000) == BusMath.hours_to_dollars(bound)
+    assert BusMath.price_for_hour(bound + 1000) == BusMath.price_for_hour(bound - 1)
+    assert BusSnapshot.from_total(dollars).hours_purchased == bound
+
+
+def test_negative_total() -> None:
+    assert BusMath.dollars_to_hours(-5.0) == 0
+    assert BusMath.dollars_to_hours(float("-inf")) == 0
+
+
+def test_nan_rejected() -> None:
+    with pytest.raises(ValueError):
+        BusMath.dollars_to_hours(float("nan"))
+    with pytest.raises(ValueError):
+        BusSnapshot.from_total(float("nan"))
+
+
+def test_batch_matches_scalar() -> None:
+    rng = random.Random(2007)
+    totals = [round(rng.uniform(-10, 2_000_000), 2) for _ in range(1000)]
+    totals += [0.0, 1e20]
+    assert BusMath.dollars_to_hours_batch(totals) == [
+        BusMath.dollars_to_hours(total) for total in totals
+    ]
+    assert BusMath.dollars_to_hours_batch([]) == []
+
+
+# Three hours bought, an hour into the run: the bus stops in two more
+THREE_HOURS = 3.21
+NOW = 3600.0
+
+
+def test_projection_adds_hours() -> None:
+    # $0.90 an hour. Hour 4 costs $1.23, paid 4920s from now, before the bus
+    # stops at 10800. Hour 5 costs $2.54 more, paid at 13760, before 14400.
+    # Hour 6 costs $3.94 more, paid at 19360, after it stops at 18000.
+    projection = BusProjection.from_rate(THREE_HOURS, 0.00025, 0, NOW)
+    assert projection.final_hours == 5
+    assert projection.end_time == 18000
+    assert projection.next_hour_time == pytest.approx(8520)
+    # Four hours of donations until then
+    assert projection.final_total == pytest.approx(6.81)
+
+
+def test_projection_after_stopping() -> None:
+    # Donations after the bus stops don't buy any more hours
+    assert BusProjection.from_rate(THREE_HOURS, 1.0, 0, 10800) == BusProjection(
+        THREE_HOURS, 3, 10800, None
+    )
+
+
+@pytest.mark.parametrize("dollars_per_second", [0.0, -1.0])
+def test_projection_without_donations(dollars_per_second: float) -> None:
+    assert BusProjection.from_rate(
+        THREE_HOURS, dollars_per_second, 0, NOW
+    ) == BusProjection(THREE_HOURS, 3, 10800, None)
+
+
+def test_projection_capped(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(util, "_MAX_PROJECTED_HOURS", 2)
+    # Enough to buy every hour there is straight away
+    projection = BusProjection.from_rate(THREE_HOURS, 1000.0, 0, NOW)
+    assert projection.final_hours == 5
+    assert projection.end_time == 18000
+    assert projection.final_total == pytest.approx(THREE_HOURS + 1000 * 14400)
@@ -0,0 +1,143 @@
+"""In-memory donation history for the live PubNub total."""
+
+from __future__ import annotations
+
+import math
+from array import array
+
+
+class DonationTimeline:
+    """Fixed-capacity ring buffer of (timestamp, total) samples.
+
+    Samples live in two preallocated ``array('d')`` columns so memory stays
+    at 16 bytes per slot no matter how long the run goes. Timestamps are kept
+    non-decreasing, which lets window lookups bisect the ring.
+
+    Across a gap in the samples, e.g. a restart or a lost connection, the
+    total before it is no baseline for a window after it. Everything raised
+    during the gap would count as raised within the window. After mark_gap()
+    the next sample starts the buffer over.
+    """
+
+    __slots__ = ("_capacity", "_start", "_len", "_times", "_totals", "_gap")
+
+    def __init__(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._start = 0
+        self._len = 0
+        self._times = array("d", bytes(8 * capacity))
+        self._totals = array("d", bytes(8 * capacity))
+        self._gap = False
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _slot(self, index: int) -> int:
+        return (self._start + index) % self._capacity
+
+    def mark_gap(self) -> None:
+        """Samples may be missing between the latest one and the next."""
+        self._gap = True
+
+    def unmark_gap(self) -> None:
+        """The missed samples are being appended after all."""
+        self._gap = False
+
+    def append(self, timestamp: float, total: float) -> None:
+        if self._gap:
+            self._gap = False
+            self._start = self._len = 0
+        if self._len:
+            # Late messages are folded in at the newest time seen
+            timestamp = max(timestamp, self._times[self._slot(self._len - 1)])
+        if self._len < self._capacity:
+            slot = self._slot(self._len)
+            self._len += 1
+        else:
+            slot = self._start
+            self._start = (self._start + 1) % self._capacity
+        self._times[slot] = timestamp
+        self._totals[slot] = total
+
+    def latest(self) -> tuple[float, float] | None:
+        if not self._len:
+            return None
+        slot = self._slot(self._len - 1)
+        return self._times[slot], self._totals[slot]
+
+    def oldest(self) -> tuple[float, float] | None:
+        if not self._len:
+            return None
+        return self._times[self._start], self._totals[self._start]
+
+    def _bisect_right(self, timestamp: float) -> int:
+        low, high = 0, self._len
+        while low < high:
+            mid = (low + high) // 2
+            if timestamp < self._times[self._slot(mid)]:
+                high = mid
+            else:
+                low = mid + 1
+        return low
+
+    def total_at(self, timestamp: float) -> float | None:
+        """Return the newest total recorded at or before timestamp."""
+        index = self._bisect_right(timestamp)
+        if not index:
+            return None
+        return self._totals[self._slot(index - 1)]
+
+    def rate(self, window: float, now: float) -> float | None:
+        """Return the average dollars per second over the last window seconds."""
+        latest = self.latest()
+        if latest is None:
+            return None
+        window_start = now - window
+        start_total = self.total_at(window_start)
+        if start_total is None:
+            # The buffer doesn't reach back that far, use what we have
+            oldest_time, start_total = self.oldest()  # type: ignore[misc]
+            window = now - oldest_time
+        if window <= 0:
+            return 0.0
+        return (latest[1] - start_total) / window
+
+
+class EwmaRate:
+    """Exponentially weighted donation rate, O(1) per sample.
+
+    Each sample's instantaneous rate is blended in with a weight that depends
+    on the time since the previous one, so bursts and quiet spells of
+    messages are weighted by how long they lasted rather than by count.
+    """
+
+    __slots__ = ("_time_constant", "_rate", "_time", "_total")
+
+    def __init__(self, time_constant: float) -> None:
+        self._time_constant = time_constant
+        self._rate: float | None = None
+        self._time: float | None = None
+        self._total = 0.0
+
+    def update(self, timestamp: float, total: float) -> None:
+        if self._time is None or timestamp <= self._time:
+            # Nothing to measure a rate over yet, or a late message
+            self._time = max(timestamp, self._time or timestamp)
+            self._total = total
+            return
+        elapsed = timestamp - self._time
+        rate = (total - self._total) / elapsed
+        if self._rate is None:
+            self._rate = rate
+        else:
+            weight = 1 - math.exp(-elapsed / self._time_constant)
+            self._rate += weight * (rate - self._rate)
+        self._time = timestamp
+        self._total = total
+
+    def rate_at(self, timestamp: float) -> float | None:
+        """Return dollars per second, decayed over the silence since the last sample."""
+        if self._rate is None or self._time is None:
+            return None
+        silence = max(timestamp - self._time, 0.0)
+        return self._rate * math.exp(-silence / self._time_constant)
@@ -1,17 +1,203 @@
+from __future__ import annotations
+
+import bisect
+import collections.abc
+import dataclasses
 import math
+from array import array
+
+# Largest amount the table holds, in cents
+_MAX_CENTS = 2**63 - 1
+
+
+class _CostTable:
+    """Price of every hour and cumulative cost of the first n hours, in cents.
+
+    Hour prices are rounded to the cent before being summed, so the table is
+    exact and only grows as far as the largest total asked about. It stops
+    growing at the last hour whose cumulative cost fits in _MAX_CENTS, and
+    anything past that is answered with that last hour.
+
+    Cumulative costs are a list rather than an array, bisecting an array
+    boxes every item it compares.
+    """
+
+    __slots__ = ("rate", "prices", "cumulative", "full")
+
+    def __init__(self, rate: float) -> None:
+        if rate <= 1:
+            raise ValueError("Rate must be greater than 1")
+        self.rate = rate
+        self.prices = array("q")
+        self.cumulative = [0]
+        self.full = False
+
+    def _extend(self) -> bool:
+        if self.full:
+            return False
+        try:
+            price = round(round(self.rate ** len(self.prices), 2) * 100)
+        except OverflowError:
+            price = None
+        if price is None or self.cumulative[-1] + price > _MAX_CENTS:
+            self.full = True
+            return False
+        self.prices.append(price)
+        self.cumulative.append(self.cumulative[-1] + price)
+        return True
+
+    def price(self, hour: int) -> int:
+        while len(self.prices) <= hour:
+            if not self._extend():
+                return self.prices[-1]
+        return self.prices[hour]
+
+    def cost(self, hours: int) -> int:
+        while len(self.cumulative) <= hours:
+            if not self._extend():
+                return self.cumulative[-1]
+        return self.cumulative[hours]
+
+    def hours(self, cents: int) -> int:
+        if 0 <= cents < self.cumulative[-1]:
+            # Already in the table, as every total is once the run is going
+            return bisect.bisect_right(self.cumulative, cents) - 1
+        while self.cumulative[-1] <= cents:
+            if not self._extend():
+                return len(self.cumulative) - 1
+        return max(bisect.bisect_right(self.cumulative, cents) - 1, 0)
+
+
+_COST_TABLES: dict[float, _CostTable] = {}
+
+_HOUR = 3600
+# Bound on how far a projection looks ahead, prices overflow long before a
+# real run gets there
+_MAX_PROJECTED_HOURS = 1000
+
+
+def _cost_table(rate: float) -> _CostTable:
+    table = _COST_TABLES.get(rate)
+    if table is None:
+        table = _COST_TABLES[rate] = _CostTable(rate)
+    return table
+
+
+def _to_cents(dollars: float) -> int:
+    if math.isnan(dollars):
+        raise ValueError("Total is not a number")
+    cents = dollars * 100
+    # Clamped so an absurd total can't overflow the table
+    if cents >= _MAX_CENTS:
+        return _MAX_CENTS
+    if cents <= -_MAX_CENTS:
+        return -_MAX_CENTS
+    return round(cents)
 
 
 class BusMath:
     # Math Largely from: https://loadingreadyrun.com/forum/viewtopic.php?t=10231
     @staticmethod
     def price_for_hour(hour: int, rate: float = 1.07) -> float:
-        return round(rate ** (hour), 2)
+        return _cost_table(rate).price(hour) / 100
 
     @staticmethod
     def dollars_to_hours(dollars: float, rate: float = 1.07) -> int:
-        # NOTE: This is not reflexive with hours_to_dollats
-        return math.floor(math.log((dollars * (rate - 1)) + 1) / math.log(rate))
+        """Exact to the cent, unlike the closed form it replaced.
+
+        Slower than that closed form by the cost of a bisect over a few hundred
+        hours, the tests/benchmarks/test_busmath.py benchmarks measure both.
+        Raises ValueError for NaN, callers reject totals that aren't finite.
+        """
+        table = _COST_TABLES.get(rate) or _cost_table(rate)
+        cents = dollars * 100
+        cumulative = table.cumulative
+        # Inlined common case of _to_cents and hours, NaN fails it too
+        if 0 <= cents < cumulative[-1]:
+            return bisect.bisect_right(cumulative, round(cents)) - 1
+        return table.hours(_to_cents(dollars))
 
     @staticmethod
     def hours_to_dollars(hours: int, rate: float = 1.07) -> float:
-        return round((1 - (rate**hours)) / (1 - rate), 2)
+        return _cost_table(rate).cost(hours) / 100
+
+    @staticmethod
+    def dollars_to_hours_batch(
+        totals: collections.abc.Iterable[float], rate: float = 1.07
+    ) -> list[int]:
+        """Convert many totals at once, e.g. when replaying a recorded run."""
+        table = _cost_table(rate)
+        cents = [_to_cents(total) for total in totals]
+        if not cents:
+            return []
+        table.hours(max(cents))
+        cumulative = table.cumulative
+        return [max(bisect.bisect_right(cumulative, c) - 1, 0) for c in cents]
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class BusSnapshot:
+    """Everything the live sensors show, derived once from a single total."""
+
+    total_raised: float
+    hours_purchased: int
+    cost_of_purchased: float
+    next_hour_price_total: float
+    next_hour_price_remaining: float
+
+    @classmethod
+    def from_total(cls, total: float, rate: float = 1.07) -> BusSnapshot:
+        table = _cost_table(rate)
+        cents = _to_cents(total)
+        hours = table.hours(cents)
+        cost = table.cost(hours)
+        price = table.price(hours)
+        return cls(
+            total_raised=total,
+            hours_purchased=hours,
+            cost_of_purchased=cost / 100,
+            next_hour_price_total=price / 100,
+            next_hour_price_remaining=(cost + price - cents) / 100,
+        )
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class BusProjection:
+    """Where the run ends up if donations keep coming in at a steady rate."""
+
+    final_total: float
+    final_hours: int
+    # Unix timestamps
+    end_time: float
+    next_hour_time: float | None
+
+    @classmethod
+    def from_rate(
+        cls,
+        total: float,
+        dollars_per_second: float,
+        start_time: float,
+        now: float,
+        rate: float = 1.07,
+    ) -> BusProjection:
+        table = _cost_table(rate)
+        cents = _to_cents(total)
+        hours = table.hours(cents)
+        end_time = start_time + hours * _HOUR
+        if end_time <= now:
+            # The bus has already stopped
+            return cls(total, hours, end_time, None)
+        cents_per_second = max(dollars_per_second, 0.0) * 100
+        if not cents_per_second:
+            return cls(total, hours, end_time, None)
+        next_hour_time = now + (table.cost(hours + 1) - cents) / cents_per_second
+        final_hours = hours
+        # Keep adding hours while each is paid for before the bus gets there
+        while final_hours < hours + _MAX_PROJECTED_HOURS:
+            paid_at = now + (table.cost(final_hours + 1) - cents) / cents_per_second
+            if paid_at >= end_time:
+                break
+            final_hours += 1
+            end_time += _HOUR
+        final_total = total + cents_per_second * (end_time - now) / 100
+        return cls(round(final_total, 2), final_hours, end_time, next_hour_time)